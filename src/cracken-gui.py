@@ -1,4 +1,5 @@
 import cracken
+import cracken.pipeline
 import logging
 import os
 import sys
@@ -9,77 +10,44 @@ from ui import dialogs, events, frames
 
 log_filename = 'logs/cracken.log'
 
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+def setup_logging():
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
 
-logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(levelname)4s - %(filename)s:%(lineno)s - %(message)s')
+    logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(levelname)4s - %(filename)s:%(lineno)s - %(message)s')
 
-def collect_all_files(logs_dlg, regular_files: list[str], archive_files: list[str], files: list[str], event: threading.Event):
-    def prepare_file(path):
-        if event.is_set():
-                return
+def process_all_files(logs_dlg, files: list[str], recursive: bool, prettify: bool, skip_error: bool, event: threading.Event) -> list[str]:
+    counts = {'found': 0, 'done': 0}
 
-        if cracken.is_file(path):
-            regular_files.append(path)
-            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, 'Found new file: %s\n' % path)
-        elif cracken.is_archive(path):
-            archive_files.append(path)
+    def listener(name, path, e):
+        if name == 'archive':
+            counts['found'] += 1
             wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, 'Found new archive file: %s\n' % path)
-
-    logs_dlg.label.SetLabel('Collecting files')
-
-    for i, child in enumerate(files):
-        cracken.collect_files(child, prepare_file)
-        logs_dlg.progress_bar.SetValue(int((i + 1) * 25 / len(files)))
-
-    logs_dlg.progress_bar.SetValue(25)
-
-def process_archive_files(logs_dlg, regular_files: list[str], archive_files: list[str], recursive: bool, event: threading.Event):
-    def prepare_file(path):
-        if event.is_set():
-            return
-
-        if cracken.is_file(path):
-            regular_files.append(path)
+        elif name == 'file':
+            counts['found'] += 1
             wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, 'Found new file: %s\n' % path)
-        elif cracken.is_archive(path):
-            archive_files.append(path)
-            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, 'Found new archive file: %s\n' % path)
-
-    logs_dlg.label.SetLabel('Processing .rpa files')
-
-    index = 0
-
-    while index < len(archive_files):
-        path = archive_files[index]
+        elif name == 'processed':
+            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - processed\n' % path)
+        elif name == 'error':
+            if not skip_error or not isinstance(e, (ModuleNotFoundError, AttributeError, TypeError)):
+                raise e
 
-        wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - trying to process\n' % path)
-        cracken.process_archive_file(path, recursive, prepare_file)
-        wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - processed\n' % path)
-        logs_dlg.progress_bar.SetValue(25 + int((index + 1) * 25 / len(archive_files)))
+            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - error %s: %s\n' % (path, e.__class__.__name__, e))
 
-        index += 1
+        if name in ('processed', 'known', 'error'):
+            counts['done'] += 1
 
-    logs_dlg.progress_bar.SetValue(50)
+        logs_dlg.progress_bar.SetValue(int(counts['done'] * 75 / max(counts['found'], 1)))
 
-def process_regular_files(logs_dlg, files: list[str], prettify: bool, skip_error: bool):
-    logs_dlg.label.SetLabel('Processing .rpyc files')
+    logs_dlg.label.SetLabel('Processing files')
 
-    for index, path in enumerate(files):
-        try:
-            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - trying to process\n' % path)
-            cracken.process_file(path, prettify)
-            wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - processed\n' % path)
-            logs_dlg.progress_bar.SetValue(50 + int((index + 1) * 25 / len(files)))
-        except (ModuleNotFoundError, AttributeError, TypeError) as e:
-            if skip_error:
-                wx.CallAfter(logs_dlg.main_log_ctrl.AppendText, '%s - error %s: %s' % (path, e.__class__.__name__, e))
-                logs_dlg.progress_bar.SetValue(50 + int((index + 1) * 25 / len(files)))
-            else:
-                raise e
+    pipeline = cracken.pipeline.Pipeline(recursive, prettify, listener=listener, event=event)
+    archive_files = pipeline.run(files)
 
     logs_dlg.progress_bar.SetValue(75)
 
+    return archive_files
+
 def remove_old_files(logs_dlg, files: list[str]):
     logs_dlg.label.SetLabel('Remove old files')
 
@@ -93,12 +61,7 @@ def remove_old_files(logs_dlg, files: list[str]):
 
 def process_data(logs_dlg, files, recursive_search, clear_after_search, prettify, skip_error, thread_event):
     try:
-        regular_files = []
-        archive_files = []
-
-        collect_all_files(logs_dlg, regular_files, archive_files, files, thread_event)
-        process_archive_files(logs_dlg, regular_files, archive_files, recursive_search, thread_event)
-        process_regular_files(logs_dlg, regular_files, prettify, skip_error)
+        archive_files = process_all_files(logs_dlg, files, recursive_search, prettify, skip_error, thread_event)
 
         if clear_after_search:
             remove_old_files(logs_dlg, archive_files)
@@ -148,6 +111,8 @@ def new_process_started(evt, frame):
 
 
 if __name__ == '__main__':
+    setup_logging()
+
     app = wx.App()
 
     frame = frames.MainFrame(None, title='Ren\'Py Cracken')
@@ -1,15 +1,37 @@
 import argparse
-import cracken
-import logging
+import json
 import os
-import traceback
+import socket
+import sys
+import time
+
+# A client of a daemon and a listing of an archive have to start fast, so they import only what they use
+CLIENT = __name__ == '__main__' and any(arg == '--connect' or arg.startswith('--connect=') for arg in sys.argv[1:])
+LISTING = __name__ == '__main__' and not CLIENT and sys.argv[1:2] == ['ls']
+
+if LISTING:
+    import loader
+elif not CLIENT:
+    import cracken
+    import cracken.daemon
+    import cracken.executors
+    import cracken.journal
+    import cracken.pipeline
+    import cracken.planner
+    import cracken.scheduler
+    import cracken.sinks
+    import cracken.streams
+    import cracken.watchdog
+    import logging
 
 log_filename = 'logs/cracken.log'
 
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+def setup_logging():
+    # Called from the main block only: worker processes and interpreters import this module too
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
 
-logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(levelname)4s - %(filename)s:%(lineno)s - %(message)s')
+    logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(levelname)4s - %(filename)s:%(lineno)s - %(message)s')
 
 def clean_lines(count):
     if count < 1:
@@ -20,48 +42,381 @@ def clean_lines(count):
 
     print(('\033[2K\n') * count + '\033[' + str(count) + 'A', end='')
 
-def main(path, recursive, clear, prettify, skip_error):
+def format_rate(size, elapsed):
+    return '%.1f MB in %.2fs, %.1f MB/s' % (size / 1024 / 1024, elapsed, size / 1024 / 1024 / elapsed if elapsed else 0)
+
+def file_callback(skip_error, processed, errors):
+    """
+    Returns a callback for files, that are processed by several workers.
+    """
+    def file_processed(path, e):
+        if e is None:
+            processed.append(path)
+            cracken.journal.record('file', path, cracken.journal.DONE)
+            return
+
+        errors.append(path)
+        cracken.journal.record('file', path, cracken.journal.FAILED)
+
+        if skip_error or not isinstance(e, (ModuleNotFoundError, AttributeError)):
+            raise e
+
+        print('%s - %s: %s' % (path, type(e).__name__, e))
+
+    return file_processed
+
+def process_files_in_parallel(files, prettify, skip_error, store, jobs, cost_model, executor_kind):
+    processed = []
+    errors = []
+
+    model = cracken.scheduler.CostModel.load(cost_model) if cost_model else None
+
+    with cracken.executors.create_executor(executor_kind, jobs) as executor:
+        report = cracken.scheduler.run(executor, jobs, cracken.executors.file_processor(executor), files, prettify, store,
+                                       model=model, callback=file_callback(skip_error, processed, errors))
+
+    print(report)
+
+    if cost_model:
+        model.calibrate(report.samples)
+        model.save(cost_model)
+
+    return len(processed), len(errors)
+
+def process_files_under_watchdog(files, prettify, skip_error, store, sink, jobs, timeout, memory_limit, quarantine):
+    processed = []
+    errors = []
+
+    with cracken.watchdog.Watchdog(jobs, timeout, memory_limit * 1024 * 1024 if memory_limit else None) as watchdog:
+        quarantined = watchdog.run(files, prettify, store, sink, callback=file_callback(skip_error, processed, errors))
+
+    for item in quarantined:
+        cracken.journal.record('file', item.path, cracken.journal.FAILED)
+        print('%s - quarantined: %s, %s' % (item.path, item.reason, item.detail))
+
+    if quarantine:
+        cracken.watchdog.write_report(quarantined, quarantine)
+
+    return len(processed), len(errors), len(quarantined)
+
+def run_filter(path, tar, recursive, clear, prettify, skip_error):
+    def file_failed(name, e):
+        if skip_error or not isinstance(e, (ModuleNotFoundError, AttributeError)):
+            raise e
+
+        print('%s - %s: %s' % (name, type(e).__name__, e), file=sys.stderr)
+
+    source = sys.stdin.buffer if path == '-' else open(path, 'rb')
+
+    try:
+        if tar:
+            cracken.streams.filter_tar(source, sys.stdout.buffer, recursive, clear, prettify, file_failed)
+        else:
+            cracken.streams.filter_file(source, sys.stdout.buffer, prettify)
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+
+    sys.stdout.buffer.flush()
+
+def run_client(socket_path, paths, prettify, show, shutdown):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+
+        stream = client.makefile('rwb')
+        errors = 0
+
+        def request(**kwargs):
+            stream.write(json.dumps(kwargs).encode('utf-8') + b'\n')
+            stream.flush()
+
+            return json.loads(stream.readline())
+
+        for path in paths:
+            response = request(op='decompile' if show else 'process', path=os.path.abspath(path), prettify=prettify)
+
+            if not response['ok']:
+                errors += 1
+                print('%s - %s' % (path, response['error']), file=sys.stderr)
+            elif show:
+                sys.stdout.write(response['text'])
+            else:
+                for error in response['errors']:
+                    print('%s - %s' % (error['path'], error['error']), file=sys.stderr)
+
+                errors += len(response['errors'])
+
+        if shutdown:
+            request(op='shutdown')
+
+    return errors
+
+def run_ls(path):
+    with open(path, 'rb') as file:
+        index = loader.read_archive_index(file)
+
+        if index is None:
+            raise ValueError('%s is not an archive' % path)
+
+        lines = []
+
+        for entry in loader.iter_listing(file, index):
+            lines.append('{"name": %s, "offset": %d, "length": %d, "prefix": %d, "type": "%s"}\n' % (
+                json.encoder.encode_basestring_ascii(entry['name']), entry['offset'], entry['length'], entry['prefix'], entry['type']))
+
+            # Lines are written in batches, a write per line costs more than formatting it
+            if len(lines) == 1024:
+                sys.stdout.write(''.join(lines))
+                lines.clear()
+
+        sys.stdout.write(''.join(lines))
+
+    sys.stdout.flush()
+
+def run_pipeline(path, recursive, clear, prettify, skip_error, store, fingerprints, known_files, memory_budget, sink=None,
+                 extract_workers=1):
+    counts = {'archive': 0, 'file': 0, 'known': 0, 'processed': 0, 'error': 0}
+
+    def listener(name, path, e):
+        counts[name] += 1
+
+        if name != 'error':
+            return
+
+        if skip_error or not isinstance(e, (ModuleNotFoundError, AttributeError)):
+            raise e
+
+        print('%s - %s: %s' % (path, type(e).__name__, e))
+
+    pipeline = cracken.pipeline.Pipeline(recursive, prettify, store, fingerprints, known_files == 'copy' and not sink,
+                                         memory_budget=memory_budget * 1024 * 1024, listener=listener, sink=sink,
+                                         extract_workers=extract_workers)
+    start = time.perf_counter()
+    archive_files = pipeline.run([path])
+
+    if not counts['archive'] and not counts['file']:
+        print('No files were found!')
+        return None
+
+    if clear:
+        for path in archive_files:
+            os.remove(path)
+
+    print('%d archive(s) were extracted, %d file(s) were decompiled' % (len(archive_files), counts['processed']))
+
+    if archive_files:
+        print('Extraction: %s' % format_rate(pipeline.extracted_size, pipeline.extract_time))
+
+    if counts['known']:
+        print('%d known Ren\'Py SDK file(s) were not decompiled' % counts['known'])
+
+    print('All done, bye 👋')
+
+    return {
+        'archives': len(archive_files) - pipeline.nested_extracted,
+        'nested_archives': pipeline.nested_extracted,
+        'extracted_bytes': pipeline.extracted_size,
+        'files': counts['processed'],
+        'known': counts['known'],
+        'errors': counts['error'],
+        'elapsed': time.perf_counter() - start,
+    }
+
+def main(path, recursive, clear, prettify, skip_error, store=None, fingerprints=None, known_files='skip', jobs=1, cost_model=None,
+         executor_kind='process', benchmark=False, sink=None, extract_workers=1, archive_jobs=1, io_budget=None,
+         timeout=None, memory_limit=None, quarantine=None):
     archive_files = []
+    nested_files = []
     regular_files = []
+    container_files = []
+
+    summary = {'archives': 0, 'nested_archives': 0, 'extracted_bytes': 0, 'files': 0, 'known': 0, 'errors': 0, 'quarantined': 0}
+    start = time.perf_counter()
 
-    def prepare_file(path):
+    def prepare_file(path, found=False):
         if cracken.is_archive(path):
-            archive_files.append(path)
+            (nested_files if found else archive_files).append(path)
         elif cracken.is_file(path):
-            regular_files.append(path)
+            # Scripts of other shards are still found, but left to them.
+            # Files found in archives were extracted by this shard, so they belong to it
+            if found or cracken.shards.owns(path):
+                regular_files.append(path)
+        elif cracken.is_container(path):
+            container_files.append((path, found))
+
+    def found_file(path):
+        prepare_file(path, found=True)
+
+    def bundle_failed(path, e):
+        # Files in a bundle are decompiled while they are extracted
+        summary['errors'] += 1
+
+        if skip_error or not isinstance(e, (ModuleNotFoundError, AttributeError)):
+            raise e
+
+        print()
+        print('%s - %s: %s' % (path, type(e).__name__, e))
 
     cracken.collect_files(os.path.abspath(path), prepare_file)
 
-    if not len(regular_files) and not len(archive_files):
+    if not len(regular_files) and not len(archive_files) and not len(container_files):
         print('No files were found!')
-        return
+        return None
+
+    extract_time = 0
+
+    # Archives may hold containers and containers may hold archives, so both are processed until nothing new is found
+    while container_files or archive_files or nested_files:
+        containers = container_files[:]
+        container_files.clear()
+
+        for path, nested in containers:
+            if cracken.journal.is_done('archive', path):
+                continue
+
+            try:
+                print('Trying to read %s' % path, end='')
+                cracken.journal.record('archive', path, cracken.journal.STARTED)
+                cracken.vfs.process_container(path, recursive, found_file if recursive else None, store, sink, prettify, nested,
+                                              bundle_failed)
+                cracken.journal.record('archive', path, cracken.journal.DONE)
+                clean_lines(1)
+            except (ModuleNotFoundError, AttributeError) as e:
+                print()
+                summary['errors'] += 1
+                cracken.journal.record('archive', path, cracken.journal.FAILED)
+
+                if skip_error:
+                    raise e
+
+                print(type(e).__name__ + ':', e)
+
+        if not archive_files and not nested_files:
+            continue
 
-    while archive_files:
-        path = archive_files.pop()
+        archives, nested = archive_files[:], nested_files[:]
+        archive_files.clear()
+        nested_files.clear()
 
-        print('Trying to extract %s' % path, end='')
-        cracken.process_archive_file(path, recursive, prepare_file if recursive else None)
+        print('Trying to extract %d archive(s)' % (len(archives) + len(nested)), end='')
+        extract_start = time.perf_counter()
+        extracted, extracted_size = cracken.scheduler.extract(archives, archive_jobs, recursive,
+                                                              found_file if recursive else None, store, sink, prettify,
+                                                              extract_workers, io_budget, nested, bundle_failed)
         clean_lines(1)
 
+        elapsed = time.perf_counter() - extract_start
+        extract_time += elapsed
+
+        print('%d archive(s) were extracted: %s' % (len(extracted), format_rate(extracted_size, elapsed)))
+
+        # Every shard extracts archives of the input, while a nested archive is extracted by one of them only
+        top_level = len(set(archives).intersection(extracted))
+        summary['archives'] += top_level
+        summary['nested_archives'] += len(extracted) - top_level
+        summary['extracted_bytes'] += extracted_size
+
         if clear:
-            os.remove(path)
+            for path in extracted:
+                os.remove(path)
+
+    if cost_model and summary['extracted_bytes']:
+        model = cracken.scheduler.CostModel.load(cost_model)
+        model.extract_per_byte = extract_time / summary['extracted_bytes']
+        model.save(cost_model)
+
+    known = 0
+    files = []
 
     for path in regular_files:
-        try:
-            print('Trying to deserialize %s' % path, end='')
-            cracken.process_file(path, prettify)
-            clean_lines(1)
-        except (ModuleNotFoundError, AttributeError) as e:
-            print()
+        if cracken.journal.is_done('file', path):
+            continue
 
-            if skip_error:
-                raise e
+        if fingerprints and cracken.process_known_file(path, fingerprints, known_files == 'copy' and not sink):
+            known += 1
+        else:
+            cracken.journal.record('file', path, cracken.journal.PLANNED)
+            files.append(path)
 
-            print(type(e).__name__ + ':', e)
+    if benchmark:
+        for kind, elapsed in cracken.executors.benchmark(files, prettify, store, workers=jobs).items():
+            print('%s executor: %d file(s) in %.2fs with %d worker(s)' % (kind, len(files), elapsed, jobs))
+    elif timeout or memory_limit:
+        summary['files'], summary['errors'], summary['quarantined'] = process_files_under_watchdog(
+            files, prettify, skip_error, store, sink, jobs, timeout, memory_limit, quarantine)
+    elif jobs > 1:
+        summary['files'], summary['errors'] = process_files_in_parallel(files, prettify, skip_error, store, jobs, cost_model,
+                                                                        executor_kind)
+    else:
+        for path in files:
+            try:
+                print('Trying to deserialize %s' % path, end='')
+                cracken.journal.record('file', path, cracken.journal.STARTED)
+                cracken.process_file(path, prettify, store, sink)
+                cracken.journal.record('file', path, cracken.journal.DONE)
+                clean_lines(1)
+                summary['files'] += 1
+            except (ModuleNotFoundError, AttributeError) as e:
+                print()
+                summary['errors'] += 1
+                cracken.journal.record('file', path, cracken.journal.FAILED)
+
+                if skip_error:
+                    raise e
+
+                print(type(e).__name__ + ':', e)
+
+    if known:
+        print('%d known Ren\'Py SDK file(s) were not decompiled' % known)
 
     print('All done, bye 👋')
 
-if __name__ == '__main__':
+    summary['known'] = known
+    summary['elapsed'] = time.perf_counter() - start
+
+    return summary
+
+if CLIENT:
+    parser = argparse.ArgumentParser(prog='cracken.py', description='Send files to a running cracken.py --serve')
+    parser.add_argument('--connect',          help='Socket of the daemon', metavar='SOCKET', required=True)
+    parser.add_argument('-p', '--prettify',   help='Try to make Python code snippets more pretty', action='store_true')
+    parser.add_argument('--print',            help='Print restored scripts instead of writing them', action='store_true')
+    parser.add_argument('--shutdown',         help='Stop the daemon after the files are processed', action='store_true')
+    parser.add_argument('file', help='Compiled files or folders, that the daemon should process', nargs='*')
+
+    args = parser.parse_args()
+
+    try:
+        sys.exit(1 if run_client(args.connect, args.file, args.prettify, args.print, args.shutdown) else 0)
+    except OSError as e:
+        parser.error('can\'t connect to %s: %s' % (args.connect, e))
+elif LISTING:
+    parser = argparse.ArgumentParser(prog='cracken.py ls', description='List entries of a RenPy archive as JSON lines')
+    parser.add_argument('archive', help='Path to an archive')
+
+    args = parser.parse_args(sys.argv[2:])
+
+    try:
+        run_ls(args.archive)
+    except ValueError as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # The output was piped into a program, that stopped reading it
+        sys.stderr.close()
+elif __name__ == '__main__' and sys.argv[1:2] == ['merge']:
+    parser = argparse.ArgumentParser(prog='cracken.py merge', description='Combine manifests or reports of --shard runs')
+    parser.add_argument('output', help='Path to the combined manifest or report')
+    parser.add_argument('inputs', help='Manifests or reports of every shard', nargs='+')
+
+    args = parser.parse_args(sys.argv[2:])
+
+    try:
+        cracken.shards.merge(args.inputs, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+elif __name__ == '__main__':
+    setup_logging()
+
     parser = argparse.ArgumentParser(prog='cracken.py', 
                                      description='Decompile RenPy files and extract additional files from a RenPy archive')
 
@@ -69,8 +424,179 @@ if __name__ == '__main__':
     parser.add_argument('-c', '--clear',      help='Delete archive files after they were processed',    action='store_true')
     parser.add_argument('-p', '--prettify',   help='Try to make Python code snippets more pretty',      action='store_true')
     parser.add_argument('-s', '--skip-error', help='Execution will not be stopped if an error happens', action='store_true')
-    parser.add_argument('file', help='Path to file\\folder that this program should process')
+    parser.add_argument('--store',            help='Keep unique files in a shared directory and link their copies', metavar='DIR')
+    parser.add_argument('--fingerprints',     help='Database of stock Ren\'Py SDK files, that will not be decompiled', metavar='FILE')
+    parser.add_argument('--known-files',      help='Skip stock Ren\'Py SDK files or copy their sources from --sdk (default: skip)',
+                        choices=('skip', 'copy'), default='skip')
+    parser.add_argument('--sdk',              help='Folder of the Ren\'Py SDK, that sources of stock files are copied from', metavar='DIR')
+    parser.add_argument('--build-fingerprints', help='Add files of the Ren\'Py SDK in the given folder to the database', metavar='DIR')
+    parser.add_argument('--sdk-version',      help='Version of the SDK, that is added with --build-fingerprints', metavar='VERSION')
+    parser.add_argument('-j', '--jobs',       help='Number of files to decompile at the same time', type=int, default=1)
+    parser.add_argument('--cost-model',       help='Timings of previous runs, used to schedule large files first', metavar='FILE')
+    parser.add_argument('--executor',         help='How --jobs are run (default: thread on free-threaded Python, process otherwise)',
+                        choices=cracken.executors.EXECUTORS, default=cracken.executors.default_executor())
+    parser.add_argument('--benchmark',        help='Compare how fast files are decompiled by each executor', action='store_true')
+    parser.add_argument('--pipeline',         help='Extract archives and decompile files at the same time', action='store_true')
+    parser.add_argument('--memory-budget',    help='Megabytes of data held by --pipeline at once (default: 256)', type=int, default=256)
+    parser.add_argument('--tar',              help='Read a tar stream and write results to the standard output as a tar stream', action='store_true')
+    parser.add_argument('-o', '--output',     help='Write all results into a single .zip, .tar, .tar.gz, .tar.bz2, .tar.xz or .tar.zst file',
+                        metavar='FILE')
+    parser.add_argument('--storage',          help='Kind of storage archives are extracted on, sets --extract-workers',
+                        choices=cracken.EXTRACT_WORKERS)
+    parser.add_argument('--extract-workers',  help='Number of threads, that extract entries of an archive (default: 1)', type=int)
+    parser.add_argument('--archive-jobs',     help='Number of archives to extract at the same time', type=int, default=1)
+    parser.add_argument('--io-rate',          help='Megabytes per second read from all archives together (default: no limit)',
+                        type=int, default=0)
+    parser.add_argument('--open-files',       help='Number of files kept open by extraction at once (default: %d)' % cracken.scheduler.OPEN_FILES,
+                        type=int, default=cracken.scheduler.OPEN_FILES)
+    parser.add_argument('--plan',             help='Print an estimate of the work as JSON without processing anything', action='store_true')
+    parser.add_argument('--manifest',         help='Write SHA-256 hashes of every extracted and restored file as JSON lines', metavar='FILE')
+    parser.add_argument('--shard',            help='Process only the i-th of N parts of the input, like 2/8', metavar='i/N')
+    parser.add_argument('--report',           help='Write counters and the elapsed time of the run as JSON', metavar='FILE')
+    parser.add_argument('--journal',          help='Record progress of the run, so it could be continued with --resume', metavar='FILE')
+    parser.add_argument('--resume',           help='Skip archives and files, that the --journal marks as done', action='store_true')
+    parser.add_argument('--timeout',          help='Seconds a single file may take before it is quarantined', type=float)
+    parser.add_argument('--memory-limit',     help='Megabytes a worker may use before its file is quarantined (Unix)', type=int)
+    parser.add_argument('--quarantine',       help='Write files, that hit --timeout or --memory-limit, as JSON lines', metavar='FILE')
+    parser.add_argument('--serve',            help='Keep workers running and process files sent by cracken.py --connect',
+                        metavar='SOCKET')
+    parser.add_argument('--drop-cache',       help='Keep archives and results out of the page cache (Linux)', action='store_true')
+    parser.add_argument('file', help='Path to file\\folder that this program should process, or - for the standard input',
+                        nargs='?')
 
     args = parser.parse_args()
 
-    main(args.file, args.recursive, args.clear, args.prettify, args.skip_error)
+    if args.file is None and not args.serve and not args.build_fingerprints:
+        parser.error('the following arguments are required: file')
+
+    if not cracken.executors.is_supported(args.executor):
+        parser.error('--executor=%s is not supported by this version of Python' % args.executor)
+
+    if args.known_files == 'copy' and not args.sdk:
+        parser.error('--known-files=copy requires --sdk')
+
+    fingerprints = cracken.FingerprintDatabase.load(args.fingerprints, args.sdk) if args.fingerprints else None
+
+    if args.build_fingerprints:
+        if not fingerprints:
+            parser.error('--build-fingerprints requires --fingerprints')
+
+        if not args.sdk_version:
+            parser.error('--build-fingerprints requires --sdk-version')
+
+        count = fingerprints.add_sdk(args.build_fingerprints, args.sdk_version)
+        fingerprints.save(args.fingerprints)
+
+        print('%d file(s) were added to %s' % (count, args.fingerprints))
+    elif args.plan:
+        model = cracken.scheduler.CostModel.load(args.cost_model) if args.cost_model and os.path.exists(args.cost_model) else None
+
+        print(json.dumps(cracken.planner.make_plan([args.file], model), indent=2))
+    elif args.serve:
+        if not cracken.daemon.is_supported():
+            parser.error('--serve is not supported on this platform')
+
+        store = cracken.ContentStore(args.store) if args.store else None
+
+        with cracken.executors.create_executor(args.executor, args.jobs) as executor:
+            cracken.daemon.warm_up(executor, args.jobs)
+
+            try:
+                cracken.daemon.Daemon(args.serve, executor, store).serve()
+            except ValueError as e:
+                parser.error(str(e))
+            except KeyboardInterrupt:
+                pass
+    elif args.file == '-' or args.tar:
+        run_filter(args.file, args.tar, args.recursive, args.clear, args.prettify, args.skip_error)
+    else:
+        if args.drop_cache:
+            try:
+                cracken.pagecache.enable()
+            except ValueError as e:
+                parser.error(str(e))
+
+        store = cracken.ContentStore(args.store) if args.store else None
+        extract_workers = args.extract_workers or cracken.EXTRACT_WORKERS.get(args.storage, 1)
+        sink = None
+
+        # Paths in bundles and manifests are relative to the input folder
+        root = os.path.abspath(args.file)
+        root = root if os.path.isdir(root) else os.path.dirname(root)
+
+        # Files under a watchdog are written by this process, whatever the number of jobs is
+        watched = args.timeout or args.memory_limit
+
+        if args.pipeline:
+            # Files of the pipeline are rendered by a single thread, that isn't scheduled or watched
+            for option in ('jobs', 'executor', 'timeout', 'memory_limit', 'archive_jobs', 'io_rate', 'open_files', 'cost_model',
+                           'benchmark'):
+                if getattr(args, option) != parser.get_default(option):
+                    parser.error('--pipeline can\'t be used with --%s' % option.replace('_', '-'))
+
+        if args.memory_limit and not cracken.watchdog.is_supported():
+            parser.error('--memory-limit is not supported on this platform')
+
+        if args.quarantine and not watched:
+            parser.error('--quarantine requires --timeout or --memory-limit')
+
+        if args.resume and not args.journal:
+            parser.error('--resume requires --journal')
+
+        # A bundle and a manifest are written anew by every run, while a resumed run skips what is already done
+        if args.resume and args.output:
+            parser.error('--resume can\'t be used with --output')
+
+        if args.resume and args.manifest:
+            parser.error('--resume can\'t be used with --manifest')
+
+        if args.output:
+            if args.jobs > 1 and not watched:
+                parser.error('--output can\'t be used with --jobs')
+
+            try:
+                sink = cracken.sinks.open_sink(args.output, root)
+            except ValueError as e:
+                parser.error(str(e))
+
+        if args.shard:
+            # Other shards could still be reading archives
+            if args.clear:
+                parser.error('--shard can\'t be used with --clear')
+
+            try:
+                cracken.shards.start(args.shard, root)
+            except ValueError as e:
+                parser.error(str(e))
+
+        if args.journal:
+            cracken.journal.start(args.journal, args.resume)
+
+        if args.manifest:
+            if args.jobs > 1 and args.executor == 'process' and not watched:
+                parser.error('--manifest can\'t be used with --jobs and --executor=process')
+
+            cracken.manifest.start(args.manifest, root)
+
+        try:
+            if args.pipeline:
+                summary = run_pipeline(args.file, args.recursive, args.clear, args.prettify, args.skip_error,
+                                       store, fingerprints, args.known_files, args.memory_budget, sink, extract_workers)
+            else:
+                summary = main(args.file, args.recursive, args.clear, args.prettify, args.skip_error,
+                               store, fingerprints, args.known_files, args.jobs, args.cost_model, args.executor, args.benchmark, sink,
+                               extract_workers, args.archive_jobs, cracken.scheduler.IOBudget(args.io_rate * 1024 * 1024, args.open_files),
+                               args.timeout, args.memory_limit, args.quarantine)
+        finally:
+            if sink:
+                sink.close()
+
+            cracken.manifest.stop()
+            cracken.shards.stop()
+            cracken.journal.stop()
+
+        if args.report and summary:
+            summary['shard'] = args.shard
+
+            with open(args.report, 'w', encoding='utf-8') as file:
+                json.dump(summary, file, indent=2)
@@ -1,11 +1,19 @@
+import collections
+import concurrent.futures
+import importlib.metadata
 import loader
 import logging
 import io
 import os
 import pickle
 import re
+import typing
 
-from cracken import mommy
+# Other subsystems are imported by programs, that use them, so every worker process doesn't pay for all of them
+from cracken import manifest, mommy, pagecache, shards, trees, vfs
+from cracken.fingerprints import FingerprintDatabase
+from cracken.sinks import Sink
+from cracken.store import ContentStore, copy_file, digest
 from renpy import EmptyLine, RootNode, TreeIterBlockEnd, TreeList, TreeNode, ValuedNode
 from renpy.ast import Define, EarlyPython, Image, Init, Python, Return, Style, Transform
 from renpy.sl2.slast import SLPython
@@ -15,11 +23,52 @@ FILE_COMMENT = '''
 # https://github.com/dododo25/renpy-cracken
 '''
 
+def _read_version() -> str:
+    # Running from a source tree, the version is taken from pyproject.toml next to it
+    try:
+        return importlib.metadata.version('renpy-cracken')
+    except importlib.metadata.PackageNotFoundError:
+        pass
+
+    try:
+        with open(os.path.join(os.path.dirname(__file__), '..', '..', 'pyproject.toml'), 'r', encoding='utf-8') as file:
+            match = re.search(r'^version\s*=\s*"([^"]+)"', file.read(), re.MULTILINE)
+    except OSError:
+        match = None
+
+    return match.group(1) if match else 'unknown'
+
+# A part of keys of cached trees, so a release never reads trees of another one
+VERSION = _read_version()
+
+# Archive entries are written by a few threads, while the next ones are read from the archive
+WRITE_WORKERS = 4
+WRITE_QUEUE = 32
+
+# Threads, that read and write archive entries at the same time, for each kind of storage
+EXTRACT_WORKERS = {
+    'hdd': 1,
+    'ssd': 4,
+    'nvme': 16,
+    'network': 32,
+}
+
 is_file = loader.is_file
 is_archive = loader.is_archive
+iter_archive = loader.iter_archive
+is_container = vfs.is_container
 
 logger = logging.getLogger(__name__)
 
+def __getattr__(name: str):
+    # asyncio is imported only when the asynchronous API is used
+    if name == 'decompile_many':
+        from cracken.aio import decompile_many
+
+        return decompile_many
+
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
 def collect_files(filepath: str, callback):
     if not os.path.exists(filepath):
         return
@@ -31,36 +80,317 @@ def collect_files(filepath: str, callback):
     for path in os.listdir(filepath):
         collect_files(os.path.join(filepath, path), callback)
 
-def process_archive_file(filepath: str, recursive: bool, callback):
-    parts = loader.load_archive(filepath)
+def process_archive_file(filepath: str, recursive: bool, callback, store: ContentStore | None = None,
+                         sink: Sink | None = None, prettify: bool = False, workers: int = 1, consumed=None,
+                         nested: bool = False, budget=None, failed=None) -> int:
+    """
+    Extracts an archive and returns the total size of its entries. The
+    consumed function receives an offset and a length of every range, that
+    was read from the archive.
+
+    With a sink, compiled entries are decompiled right away. The failed
+    function receives a path and an exception, if one of them can't be
+    decompiled. Without it, the exception is raised.
+
+    A nested archive was found inside of another one, so it belongs to the
+    shard, that extracted it, and all of its entries are extracted.
+
+    A budget, if given, is acquired for every entry before it's written and
+    released as soon as it's written, so it only holds entries in flight.
+    """
+    with pagecache.open_input(filepath) as file:
+        index = loader.read_archive_index(file)
+        index = index if nested else shards.select(filepath, index)
+        consumed = chain_callbacks(pagecache.dropper(file), consumed)
+
+        # A bundle is written by one thread anyway
+        if workers > 1 and not sink and hasattr(os, 'pread'):
+            return extract_archive_entries(filepath, file, index, workers, recursive, callback, store, consumed, budget)
+
+        entries = loader.iter_entries(file, index, consumed)
+
+        return process_archive_entries(filepath, entries, recursive, callback, store, sink, prettify, budget, failed)
+
+def process_archive_entries(filepath: str, entries, recursive: bool, callback, store: ContentStore | None = None,
+                            sink: Sink | None = None, prettify: bool = False, budget=None, failed=None) -> int:
+    """
+    Writes archive entries next to the archive and returns their total size.
+    See process_archive_file for the failed function.
+    """
+    size = 0
+    pending = collections.deque()
+    folders = set()
+
+    with concurrent.futures.ThreadPoolExecutor(WRITE_WORKERS) as executor:
+        for key, value in entries:
+            full_path = get_entry_path(filepath, key)
+            size += len(value)
+
+            if budget:
+                budget.acquire(len(value))
+
+            # Files in a bundle can't be found on disk, so they are processed right away
+            if sink:
+                try:
+                    process_bundle_entry(full_path, value, recursive, sink, prettify, failed)
+                finally:
+                    if budget:
+                        budget.release(len(value))
 
-    for key, value in parts.items():
-        full_path = os.path.join(*os.path.split(filepath)[:-1], *key.split('/'))
+                continue
 
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            future = executor.submit(write_archive_entry, full_path, value, store, folders)
 
-        with open(full_path, 'wb') as file:
-            file.write(value)
+            # Released by the writer, so the budget is never held by an entry, that waits for its turn to be finished
+            if budget:
+                future.add_done_callback(lambda _, length=len(value): budget.release(length))
 
-        if not recursive:
-            continue
+            pending.append((full_path, future))
+
+            if len(pending) >= WRITE_QUEUE:
+                finish_archive_entry(*pending.popleft(), recursive, callback)
+
+        while pending:
+            finish_archive_entry(*pending.popleft(), recursive, callback)
+
+    return size
+
+def extract_archive_entries(filepath: str, file: typing.BinaryIO, index: loader.ArchiveIndex, workers: int,
+                            recursive: bool, callback, store: ContentStore | None = None, consumed=None, budget=None) -> int:
+    """
+    Writes archive entries next to the archive with a pool of threads and
+    returns their total size. Every thread reads its own ranges of the archive
+    with pread, so threads never share a file position.
+    """
+    folders = set()
+
+    def extract(begin, end, entries):
+        paths = []
+        size = 0
+
+        if budget:
+            budget.acquire(end - begin)
+
+        try:
+            block = memoryview(pread(file.fileno(), end - begin, begin))
+
+            for key, value in loader.iter_block_entries(block, begin, entries):
+                full_path = get_entry_path(filepath, key)
+                write_archive_entry(full_path, value, store, folders)
+                paths.append(full_path)
+                size += len(value)
+        finally:
+            if budget:
+                budget.release(end - begin)
+
+        if consumed:
+            consumed(begin, end - begin)
+
+        return paths, size
+
+    size = 0
 
-        if callback and os.path.isfile(full_path):
-            callback(full_path)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        # Only ranges are queued, so at most one block per thread is held in memory
+        for paths, block_size in executor.map(lambda block: extract(*block), loader.iter_blocks(index)):
+            size += block_size
 
-def process_file(filepath: str, prettify: bool):
-    bytes = io.BytesIO(loader.load_file(filepath))
+            if recursive and callback:
+                for path in paths:
+                    callback(path)
 
-    tree = RootNode(pickle.load(bytes)[1])
+    return size
+
+def pread(fd: int, length: int, offset: int) -> bytes:
+    """
+    Reads the range like a buffered read does: until it's read in full or
+    the file ends. A single os.pread returns at most about 2 GiB on Linux
+    and macOS.
+    """
+    data = os.pread(fd, length, offset)
+
+    if len(data) == length:
+        return data
+
+    buffer = bytearray(data)
+
+    while len(buffer) < length and (chunk := os.pread(fd, length - len(buffer), offset + len(buffer))):
+        buffer += chunk
+
+    return buffer
+
+def chain_callbacks(*callbacks):
+    callbacks = [callback for callback in callbacks if callback]
+
+    if len(callbacks) < 2:
+        return callbacks[0] if callbacks else None
+
+    def chained(*args):
+        for callback in callbacks:
+            callback(*args)
+
+    return chained
+
+def get_entry_path(filepath: str, key: str) -> str:
+    return os.path.join(*os.path.split(filepath)[:-1], *key.split('/'))
+
+def make_folder(path: str, folders: set):
+    # Most entries share their folder with a previous one, so it's created once
+    if path not in folders:
+        os.makedirs(path, exist_ok=True)
+        folders.add(path)
+
+def write_archive_entry(filepath: str, data: bytes, store: ContentStore | None = None, folders: set | None = None):
+    if folders is None:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    else:
+        make_folder(os.path.dirname(filepath), folders)
+
+    if store:
+        key = store.put(data)
+        store.link(key, filepath)
+        manifest.record('entry', filepath, data, key)
+    else:
+        with pagecache.open_output(filepath) as file:
+            file.write(data)
+
+        manifest.record('entry', filepath, data)
+
+def finish_archive_entry(filepath: str, future: concurrent.futures.Future, recursive: bool, callback):
+    future.result()
+
+    if recursive and callback and os.path.isfile(filepath):
+        callback(filepath)
+
+def process_bundle_entry(filepath: str, data: bytes, recursive: bool, sink: Sink, prettify: bool, failed=None):
+    sink.write(filepath, data)
+    manifest.record('entry', filepath, data)
+
+    if not recursive:
+        return
+
+    if loader.is_file_data(filepath, data):
+        try:
+            text = decompile_bytes(data, prettify=prettify).encode('utf-8')
+        except Exception as e:
+            if not failed:
+                raise
+
+            failed(filepath, e)
+            return
+
+        sink.write(get_restored_path(filepath), text)
+        manifest.record('script', get_restored_path(filepath), text)
+    elif filepath.endswith('.rpa'):
+        for key, value in loader.iter_archive(data):
+            process_bundle_entry(os.path.join(os.path.dirname(filepath), *key.split('/')), value, recursive, sink, prettify,
+                                 failed)
+
+def process_file(filepath: str, prettify: bool, store: ContentStore | None = None, sink: Sink | None = None):
+    if not store and not sink:
+        prepare_restored_file(filepath, prepare_tree(load_tree(loader.load_file(filepath)), prettify))
+        return
+
+    with open(filepath, 'rb') as file:
+        write_restored_file(filepath, decompile_bytes(file.read(), prettify=prettify, store=store), store, sink)
+
+def decompile_bytes(data: bytes, *, prettify: bool = False, store: ContentStore | None = None) -> str:
+    """
+    Restores a script from the content of a compiled file. Nothing is read
+    from or written to the filesystem, unless a store is given.
+    """
+    if not store:
+        return ''.join(iter_decompiled(data, prettify=prettify))
+
+    # An identical file is rendered once per store, every other copy reuses the result
+    data_digest = digest(data)
+    key = '%s-%s%s' % (data_digest, VERSION, '-prettify' if prettify else '')
+    result = store.read('rendered', key)
+
+    if result is not None:
+        text = store.read('objects', result.decode('ascii'))
+
+        if text is not None:
+            return text.decode('utf-8')
+
+    text = render_tree(prepare_tree(load_cached_tree(data, data_digest, store), prettify))
+    store.write('rendered', key, store.put(text.encode('utf-8')).encode('ascii'))
+
+    return text
+
+def decompile_in_worker(data: bytes, prettify: bool, store_root: str | None) -> bytes:
+    """
+    Restores a script in a worker process or a subinterpreter, that gets the
+    root of a store instead of the store itself.
+    """
+    store = ContentStore(store_root) if store_root else None
+
+    return decompile_bytes(data, prettify=prettify, store=store).encode('utf-8')
+
+def iter_decompiled(data: bytes, *, prettify: bool = False):
+    """
+    Restores a script from the content of a compiled file part by part, so
+    the output could be streamed while it's being rendered.
+    """
+    return iter_restored_parts(prepare_tree(load_tree(loader.load_bytes(data)), prettify))
+
+def process_known_file(filepath: str, fingerprints: FingerprintDatabase, copy: bool, data: bytes | None = None) -> dict | None:
+    """
+    Returns the record of a stock SDK file, or None if the file has to be
+    decompiled. With copy, a stock file is restored from its source in the
+    SDK, and it's decompiled like any other, if there is no such source.
+    """
+    if data is None:
+        with open(filepath, 'rb') as file:
+            data = file.read()
+
+    record = fingerprints.lookup(data)
+
+    if not record or not copy:
+        return record
+
+    source = fingerprints.find_source(record)
+
+    if not source:
+        return None
+
+    # Sources are copied, so an edit of a restored script never reaches the SDK
+    copy_file(source, get_restored_path(filepath))
+
+    return record
+
+def load_cached_tree(data: bytes, data_digest: str, store: ContentStore) -> RootNode:
+    # Trees are cached before any option-dependent pass, so they could be rendered with any options
+    key = '%s-%s' % (data_digest, VERSION)
+    frozen = store.read('trees', key)
+    tree = trees.thaw(frozen) if frozen else None
+
+    if tree is None:
+        tree = load_tree(loader.load_bytes(data))
+
+        try:
+            store.write('trees', key, trees.freeze(tree))
+        except ValueError as e:
+            logger.warning('Tree was not cached: %s', e)
+
+    return tree
+
+def load_tree(data: bytes) -> RootNode:
+    tree = RootNode(pickle.load(io.BytesIO(data))[1])
 
     remove_excluded_nodes(tree)
     remove_excessive_empty_lines(tree)
+
+    return tree
+
+def prepare_tree(tree: RootNode, prettify: bool) -> RootNode:
     prepare_python_code_snippets(tree, prettify)
     filter_simple_python_blocks(tree)
     filter_simple_init_blocks(tree)
     filter_simple_init_python_blocks(tree)
     prepare_image_nodes(tree, prettify)
-    prepare_restored_file(filepath, tree)
+
+    return tree
 
 def remove_excluded_nodes(tree: TreeNode):
     nodes_to_remove = set()
@@ -196,7 +526,7 @@ def prepare_image_nodes(tree: TreeNode, prettify: bool):
         node.value = parts[0]
         node.nchildren = TreeList(list(map(map_code, parts[1:])), node)
 
-def prepare_restored_file(file, tree):
+def get_restored_path(file: str) -> str:
     restored_file = '.'.join(file.split('.')[:-1])
 
     if file.split('.')[-1] == 'rpyc':
@@ -204,22 +534,64 @@ def prepare_restored_file(file, tree):
     elif file.split('.')[-1] == 'rpymc':
         restored_file += '.rpym'
 
-    with open(restored_file, 'w', encoding='utf-8') as wfile:
-        level = 0
+    return restored_file
+
+def write_restored_file(file: str, text: str, store: ContentStore | None = None, sink: Sink | None = None):
+    if sink:
+        data = text.encode('utf-8')
+        sink.write(get_restored_path(file), data)
+        manifest.record('script', get_restored_path(file), data)
+        return
+
+    if store:
+        data = text.encode('utf-8')
+        key = store.put(data)
+        store.link(key, get_restored_path(file))
+        manifest.record('script', get_restored_path(file), data, key)
+        return
+
+    with pagecache.open_output(get_restored_path(file), 'w', encoding='utf-8') as wfile:
+        wfile.write(text)
 
-        for node in tree:
-            if isinstance(node, TreeIterBlockEnd):
-                level -= 1
-            elif not isinstance(node, RootNode):
-                value = str(node)
+    if manifest.ACTIVE:
+        manifest.record('script', get_restored_path(file), text.encode('utf-8'))
+
+def prepare_restored_file(file, tree):
+    hasher = manifest.hasher()
+    size = 0
+
+    with pagecache.open_output(get_restored_path(file), 'w', encoding='utf-8') as wfile:
+        for part in iter_restored_parts(tree):
+            wfile.write(part)
+
+            # Parts are hashed while they are written, so the file isn't read again
+            if hasher:
+                data = part.encode('utf-8')
+                hasher.update(data)
+                size += len(data)
+
+    if hasher:
+        manifest.ACTIVE.add('script', get_restored_path(file), size, hasher.hexdigest())
+
+def render_tree(tree: TreeNode) -> str:
+    return ''.join(iter_restored_parts(tree))
+
+def iter_restored_parts(tree: TreeNode):
+    level = 0
+
+    for node in tree:
+        if isinstance(node, TreeIterBlockEnd):
+            level -= 1
+        elif not isinstance(node, RootNode):
+            value = str(node)
 
-                if value != '':
-                    wfile.write(' ' * (level * 4) + str(node))
+            if value != '':
+                yield ' ' * (level * 4) + value
 
-                wfile.write('\n')
-                level += 1
+            yield '\n'
+            level += 1
 
-        if level == -1 and len(tree.nchildren):
-            wfile.write(FILE_COMMENT)
-        else:
-            wfile.write(FILE_COMMENT[1:])
+    if level == -1 and len(tree.nchildren):
+        yield FILE_COMMENT
+    else:
+        yield FILE_COMMENT[1:]
@@ -0,0 +1,79 @@
+import asyncio
+import concurrent.futures
+import cracken
+import functools
+
+from cracken.store import ContentStore
+
+DEFAULT_LIMIT = 8
+
+class Result:
+    """
+    An outcome of decompiling a single file. If the file was written, output
+    holds a path to the restored file. If it failed, error holds the exception.
+    """
+
+    def __init__(self, path: str, text: str | None = None, output: str | None = None, error: Exception | None = None):
+        self.path   = path
+        self.text   = text
+        self.output = output
+        self.error  = error
+
+    def __repr__(self):
+        return '<Result %s%s>' % (self.path, ' error=%r' % self.error if self.error else '')
+
+async def decompile_many(paths, *, prettify: bool = False, write: bool = False, store: ContentStore | None = None,
+                         limit: int = DEFAULT_LIMIT, executor: concurrent.futures.Executor | None = None):
+    """
+    Decompiles files and yields a Result for every one of them as soon as it
+    is ready, so results come in order of completion.
+
+    Files are read in threads, while decompilation runs on the given executor
+    (the default executor of the loop, if there is none). At most 'limit'
+    files are in progress at any time, and paths are taken from the iterable
+    only when there is room for them. Closing the generator or cancelling the
+    task, that iterates it, cancels every file in progress.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def decompile(path):
+        try:
+            data = await asyncio.to_thread(_read, path)
+            text = await loop.run_in_executor(executor, functools.partial(cracken.decompile_bytes, data, prettify=prettify, store=store))
+
+            if not write:
+                return Result(path, text)
+
+            await asyncio.to_thread(cracken.write_restored_file, path, text, store)
+
+            return Result(path, text, cracken.get_restored_path(path))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return Result(path, error=e)
+
+    iterator = iter(paths)
+    pending = set()
+
+    try:
+        while True:
+            for path in iterator:
+                pending.add(asyncio.ensure_future(decompile(path)))
+
+                if len(pending) >= limit:
+                    break
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _read(path: str) -> bytes:
+    with open(path, 'rb') as file:
+        return file.read()
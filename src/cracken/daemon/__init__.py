@@ -0,0 +1,194 @@
+import collections
+import concurrent.futures
+import cracken
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from cracken.store import ContentStore, digest
+
+# Megabytes of restored scripts kept in memory between requests
+CACHE_SIZE = 64
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    Restored scripts of recently seen files, keyed by their content and
+    options. Oldest results are dropped first, once the size is exceeded.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.used = 0
+
+        self._lock = threading.Lock()
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._items:
+                return None
+
+            self._items.move_to_end(key)
+
+            return self._items[key]
+
+    def put(self, key: str, data: bytes):
+        with self._lock:
+            if key in self._items or len(data) > self.size:
+                return
+
+            self._items[key] = data
+            self.used += len(data)
+
+            while self.used > self.size:
+                self.used -= len(self._items.popitem(last=False)[1])
+
+class Daemon:
+    """
+    Serves decompilation requests of local clients. Workers, imported modules
+    and recent results stay resident, so a request pays for its file only.
+    """
+
+    def __init__(self, socket_path: str, executor: concurrent.futures.Executor, store: ContentStore | None = None,
+                 cache_size: int = CACHE_SIZE * 1024 * 1024):
+        self.socket_path = socket_path
+        self.executor    = executor
+        self.store       = store
+        self.cache       = ResultCache(cache_size)
+
+        self._server = None
+
+    def serve(self):
+        """
+        Listens on the socket until a client asks to shut down.
+        """
+        if not is_supported():
+            raise ValueError('daemon mode requires Unix domain sockets')
+
+        _remove_stale_socket(self.socket_path)
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+
+        try:
+            # Only the user, that started the daemon, may send it files
+            os.chmod(self.socket_path, 0o600)
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.remove(self.socket_path)
+
+    def shutdown(self):
+        threading.Thread(target=self._server.shutdown).start()
+
+    def handle(self, request: dict) -> dict:
+        op = request.get('op')
+
+        if op == 'ping':
+            return {'ok': True, 'version': cracken.VERSION, 'pid': os.getpid(), 'cached': len(self.cache)}
+
+        if op == 'shutdown':
+            self.shutdown()
+            return {'ok': True}
+
+        if op == 'decompile':
+            return {'ok': True, 'text': self.render(request['path'], request.get('prettify', False)).decode('utf-8')}
+
+        if op == 'process':
+            return self.process(request['path'], request.get('prettify', False))
+
+        raise ValueError('unknown operation: %s' % op)
+
+    def render(self, path: str, prettify: bool) -> bytes:
+        return self._submit(path, prettify).result()
+
+    def process(self, path: str, prettify: bool) -> dict:
+        """
+        Writes a restored script for every compiled file under the path.
+        """
+        if not os.path.exists(path):
+            raise ValueError('%s does not exist' % path)
+
+        paths = []
+        futures = {}
+        errors = []
+
+        cracken.collect_files(path, lambda filepath: paths.append(filepath) if cracken.is_file(filepath) else None)
+
+        for filepath in paths:
+            futures[filepath] = self._submit(filepath, prettify)
+
+        for filepath, future in futures.items():
+            try:
+                cracken.write_restored_file(filepath, future.result().decode('utf-8'), self.store)
+            except Exception as e:
+                errors.append({'path': filepath, 'error': '%s: %s' % (type(e).__name__, e)})
+
+        return {'ok': True, 'files': len(paths) - len(errors), 'errors': errors}
+
+    def _submit(self, path: str, prettify: bool) -> concurrent.futures.Future:
+        if not cracken.is_file(path):
+            raise ValueError('%s is not a compiled Ren\'Py file' % path)
+
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        key = '%s-%s' % (digest(data), 'prettify' if prettify else 'plain')
+        text = self.cache.get(key)
+
+        if text is not None:
+            future = concurrent.futures.Future()
+            future.set_result(text)
+
+            return future
+
+        future = self.executor.submit(cracken.decompile_in_worker, data, prettify, self.store.root if self.store else None)
+        future.add_done_callback(lambda future: self.cache.put(key, future.result()) if not future.exception() else None)
+
+        return future
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Every line is a JSON request, that gets a JSON line in response
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.owner.handle(json.loads(line))
+            except Exception as e:
+                logger.exception('Request failed: %s', line)
+                response = {'ok': False, 'error': '%s: %s' % (type(e).__name__, e)}
+
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+def is_supported() -> bool:
+    return hasattr(socket, 'AF_UNIX')
+
+def warm_up(executor: concurrent.futures.Executor, workers: int):
+    """
+    Starts every worker of the executor in advance, so the first requests
+    don't wait for them.
+    """
+    list(executor.map(int, range(workers)))
+
+def _remove_stale_socket(socket_path: str):
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            # Nobody listens, it was left by a daemon, that didn't exit cleanly
+            os.remove(socket_path)
+            return
+
+    raise ValueError('another daemon already listens on %s' % socket_path)
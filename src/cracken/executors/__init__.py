@@ -0,0 +1,107 @@
+import concurrent.futures
+import cracken
+import os
+import sys
+import sysconfig
+import time
+
+EXECUTORS = ('process', 'thread', 'interpreters')
+
+# A folder, that holds cracken, loader and renpy packages
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class InterpreterExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    Decompiles files in a pool of subinterpreters (Python 3.14+).
+
+    Each subinterpreter imports renpy and cracken once and keeps its own copy
+    of their module state. Threads of this pool read input files and write
+    results, so only bytes are passed between interpreters.
+    """
+
+    def __init__(self, workers: int):
+        super().__init__(workers)
+
+        # Functions are sent to subinterpreters by reference, so the import path
+        # has to be set up by a builtin before anything from cracken is sent there
+        self.interpreters = concurrent.futures.InterpreterPoolExecutor(
+            workers, initializer=exec, initargs=('import sys; sys.path.insert(0, %r); import cracken' % SOURCE_ROOT, ))
+
+    def process_file(self, filepath: str, prettify: bool, store=None):
+        with open(filepath, 'rb') as file:
+            data = file.read()
+
+        text = self.interpreters.submit(cracken.decompile_in_worker, data, prettify, store.root if store else None).result()
+        cracken.write_restored_file(filepath, text.decode('utf-8'), store)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        super().shutdown(wait, cancel_futures=cancel_futures)
+        self.interpreters.shutdown(wait, cancel_futures=cancel_futures)
+
+def is_free_threaded() -> bool:
+    """
+    Checks if this interpreter is a free-threaded build with the GIL actually disabled.
+    """
+    if not sysconfig.get_config_var('Py_GIL_DISABLED'):
+        return False
+
+    return not sys._is_gil_enabled()
+
+def default_executor() -> str:
+    # Threads have no startup and pickling costs, but scale across cores only without the GIL
+    return 'thread' if is_free_threaded() else 'process'
+
+def is_supported(kind: str) -> bool:
+    if kind == 'interpreters':
+        return hasattr(concurrent.futures, 'InterpreterPoolExecutor')
+
+    return kind in EXECUTORS
+
+def create_executor(kind: str, workers: int) -> concurrent.futures.Executor:
+    if kind == 'process':
+        # Workers write their results themselves, but don't share module state with this process under spawn or forkserver
+        return concurrent.futures.ProcessPoolExecutor(workers, initializer=_initialize_process,
+                                                      initargs=(cracken.pagecache.ENABLED, ))
+
+    if kind == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(workers)
+
+    if kind == 'interpreters':
+        if not is_supported(kind):
+            raise ValueError('interpreters executor requires Python 3.14 or higher')
+
+        return InterpreterExecutor(workers)
+
+    raise ValueError('unknown executor: %s' % kind)
+
+def file_processor(executor: concurrent.futures.Executor):
+    """
+    Returns a function, that processes a file with the given executor.
+    """
+    return getattr(executor, 'process_file', cracken.process_file)
+
+def benchmark(paths: list[str], *args, workers: int, kinds: tuple[str] | None = None, fn=None) -> dict[str, float]:
+    """
+    Measures the wall time of processing every path with each supported kind
+    of executor, including its startup and shutdown. By default, files are
+    processed the same way, as the executor processes them in a regular run.
+    """
+    res = {}
+
+    for kind in kinds or tuple(kind for kind in EXECUTORS if is_supported(kind)):
+        start = time.perf_counter()
+
+        with create_executor(kind, workers) as executor:
+            target = fn or file_processor(executor)
+
+            for future in [executor.submit(target, path, *args) for path in paths]:
+                future.result()
+
+        res[kind] = time.perf_counter() - start
+
+    return res
+
+def _initialize_process(drop_cache: bool):
+    # Runs inside of a worker process
+    if drop_cache:
+        cracken.pagecache.enable()
@@ -0,0 +1,81 @@
+import json
+import os
+
+from cracken.store import digest
+
+COMPILED_EXTENSIONS = ('.rpyc', '.rpymc')
+
+class FingerprintDatabase:
+    """
+    Maps a SHA-256 of a compiled file to the Ren'Py SDK file it was shipped as.
+
+    Each record holds an engine version, a path relative to the SDK folder
+    and, if the SDK has one, a path and a SHA-256 of the original source
+    file. Paths are relative, so a database could be built once and shipped;
+    sources are found in the local SDK folder, if one is given.
+    """
+
+    def __init__(self, records: dict | None = None, sdk: str | None = None):
+        self.records = records if records is not None else {}
+        self.sdk     = sdk
+
+    @classmethod
+    def load(cls, filepath: str, sdk: str | None = None) -> 'FingerprintDatabase':
+        if not os.path.exists(filepath):
+            return cls(sdk=sdk)
+
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return cls(json.load(file), sdk)
+
+    def save(self, filepath: str):
+        with open(filepath, 'w', encoding='utf-8') as file:
+            json.dump(self.records, file, indent=1, sort_keys=True)
+
+    def lookup(self, data: bytes) -> dict | None:
+        return self.records.get(digest(data))
+
+    def find_source(self, record: dict) -> str | None:
+        """
+        Returns a path to the source file of a record in the local SDK, or
+        None if it's missing there or belongs to another version of the SDK.
+        """
+        if not self.sdk or 'source' not in record:
+            return None
+
+        path = os.path.join(self.sdk, *record['source'].split('/'))
+
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as file:
+            return path if digest(file.read()) == record['source_digest'] else None
+
+    def add_sdk(self, root: str, version: str) -> int:
+        count = 0
+
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.endswith(COMPILED_EXTENSIONS):
+                    continue
+
+                path = os.path.join(dirpath, filename)
+
+                with open(path, 'rb') as file:
+                    key = digest(file.read())
+
+                record = {
+                    'version': version,
+                    'path': os.path.relpath(path, root).replace(os.sep, '/'),
+                }
+
+                source = path[:-1]
+
+                if os.path.isfile(source):
+                    with open(source, 'rb') as file:
+                        record['source'] = os.path.relpath(source, root).replace(os.sep, '/')
+                        record['source_digest'] = digest(file.read())
+
+                self.records[key] = record
+                count += 1
+
+        return count
@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import time
+
+# States of a work item in order of their progress
+PLANNED  = 'planned'
+STARTED  = 'started'
+DONE     = 'done'
+FAILED   = 'failed'
+
+# A journal of the current run, if there is one
+ACTIVE = None
+
+class Journal:
+    """
+    An append-only record of work items of a run: archives ('archive') and
+    files ('file'), that were planned, started, finished or failed. It's an
+    SQLite database in WAL mode, so a record survives a crash of the run as
+    soon as it's added.
+
+    A resumed run skips items, that are done. Otherwise, the journal is
+    cleared, when it's opened.
+    """
+
+    def __init__(self, filepath: str, resume: bool = False):
+        self.filepath = filepath
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filepath, isolation_level=None, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS events '
+                                 '(id INTEGER PRIMARY KEY, kind TEXT, path TEXT, state TEXT, time REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS events_path ON events (kind, path, state)')
+
+        if not resume:
+            self._connection.execute('DELETE FROM events')
+
+        self._done = {(kind, path) for kind, path in self._connection.execute('SELECT kind, path FROM events WHERE state = ?', (DONE, ))}
+
+    def add(self, kind: str, path: str, state: str):
+        with self._lock:
+            self._connection.execute('INSERT INTO events (kind, path, state, time) VALUES (?, ?, ?, ?)',
+                                     (kind, path, state, time.time()))
+
+            if state == DONE:
+                self._done.add((kind, path))
+
+    def is_done(self, kind: str, path: str) -> bool:
+        return (kind, path) in self._done
+
+    def states(self) -> dict[str, int]:
+        """
+        Returns how many items are in each state, by their latest state.
+        """
+        with self._lock:
+            rows = self._connection.execute('SELECT state, COUNT(*) FROM events WHERE id IN '
+                                            '(SELECT MAX(id) FROM events GROUP BY kind, path) GROUP BY state').fetchall()
+
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+def start(filepath: str, resume: bool = False) -> Journal:
+    global ACTIVE
+
+    ACTIVE = Journal(filepath, resume)
+
+    return ACTIVE
+
+def stop():
+    global ACTIVE
+
+    if ACTIVE:
+        ACTIVE.close()
+
+    ACTIVE = None
+
+def record(kind: str, path: str, state: str):
+    if ACTIVE:
+        ACTIVE.add(kind, path, state)
+
+def is_done(kind: str, path: str) -> bool:
+    return bool(ACTIVE) and ACTIVE.is_done(kind, path)
@@ -0,0 +1,91 @@
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+
+# hashlib releases the GIL for large inputs, so a few threads hash in parallel
+HASH_WORKERS = 4
+
+# A manifest of the current run, if there is one
+ACTIVE = None
+
+class Manifest:
+    """
+    Collects SHA-256 hashes of extracted entries ('entry') and restored
+    scripts ('script') while they are written. Paths are stored relative to
+    the root. The manifest is saved as JSON lines, sorted by path.
+    """
+
+    def __init__(self, filepath: str, root: str, workers: int = HASH_WORKERS):
+        self.filepath = filepath
+        self.root     = root
+
+        self._lock     = threading.Lock()
+        self._records  = []
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers)
+
+    def name(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def add(self, kind: str, path: str, size: int, sha256: str):
+        future = concurrent.futures.Future()
+        future.set_result(sha256)
+
+        with self._lock:
+            self._records.append((self.name(path), kind, size, future))
+
+    def hash(self, kind: str, path: str, data: bytes):
+        future = self._executor.submit(_sha256, data)
+
+        with self._lock:
+            self._records.append((self.name(path), kind, len(data), future))
+
+    def close(self):
+        self._executor.shutdown()
+
+        with open(self.filepath, 'w', encoding='utf-8') as file:
+            for name, kind, size, future in sorted(self._records, key=lambda record: record[0]):
+                file.write(json.dumps({'path': name, 'kind': kind, 'size': size, 'sha256': future.result()}) + '\n')
+
+def start(filepath: str, root: str) -> Manifest:
+    global ACTIVE
+
+    ACTIVE = Manifest(filepath, root)
+
+    return ACTIVE
+
+def stop():
+    global ACTIVE
+
+    if ACTIVE:
+        ACTIVE.close()
+
+    ACTIVE = None
+
+def record(kind: str, path: str, data: bytes, sha256: str | None = None):
+    """
+    Adds a written file to the manifest of the current run. A known hash,
+    like a key of a content store, is used instead of hashing the data again.
+    """
+    if not ACTIVE:
+        return
+
+    if sha256:
+        ACTIVE.add(kind, path, len(data), sha256)
+    else:
+        ACTIVE.hash(kind, path, data)
+
+def hasher():
+    """
+    Returns a hash object for data, that is written by parts, or None if
+    there is no manifest.
+    """
+    return hashlib.sha256() if ACTIVE else None
+
+def load(filepath: str) -> list[dict]:
+    with open(filepath, 'r', encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
@@ -1,4 +1,5 @@
 import sys
+import threading
 import yapf
 
 config = {
@@ -13,8 +14,12 @@ config = {
     'COLUMN_LIMIT': sys.maxsize
 }
 
+# yapf keeps the current style in a global variable, so only one thread could format code at a time
+_lock = threading.Lock()
+
 def clean(code: str) -> str:
-    formatted = yapf.yapf_api.FormatCode(code, style_config=config)[0]
+    with _lock:
+        formatted = yapf.yapf_api.FormatCode(code, style_config=config)[0]
 
     if formatted[-1] == '\n':
         return formatted[:-1]
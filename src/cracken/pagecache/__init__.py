@@ -0,0 +1,77 @@
+import contextlib
+import os
+import tempfile
+import typing
+
+# Linux only, and refused for files of other users unless the process owns them
+O_NOATIME = getattr(os, 'O_NOATIME', 0)
+
+ENABLED = False
+
+def is_supported() -> bool:
+    return hasattr(os, 'posix_fadvise')
+
+def enable():
+    """
+    Keeps archives and results out of the page cache for the rest of the run,
+    so a large run doesn't evict pages of other programs.
+    """
+    global ENABLED
+
+    if not is_supported():
+        raise ValueError('page cache hints are not supported on this platform')
+
+    ENABLED = True
+
+def open_input(filepath: str) -> typing.BinaryIO:
+    if not ENABLED:
+        return open(filepath, 'rb')
+
+    file = open(filepath, 'rb', opener=_opener)
+    os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    return file
+
+def dropper(file: typing.BinaryIO):
+    """
+    Returns a function, that drops a consumed range of the file from the page
+    cache, or None if hints are disabled.
+    """
+    if not ENABLED:
+        return None
+
+    return lambda offset, length: os.posix_fadvise(file.fileno(), offset, length, os.POSIX_FADV_DONTNEED)
+
+@contextlib.contextmanager
+def open_output(filepath: str, mode: str = 'wb', encoding: str | None = None):
+    """
+    Opens a temporary file next to the output, that replaces the output once
+    it's written, so a partially written file never appears under its name.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(filepath), suffix='.tmp',
+                                     dir=os.path.dirname(filepath) or '.')
+
+    try:
+        with open(fd, mode, encoding=encoding) as file:
+            yield file
+
+            if ENABLED:
+                # Dirty pages stay in the cache, so they have to reach the disk before they are dropped
+                file.flush()
+                os.fdatasync(file.fileno())
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def _opener(filepath: str, flags: int) -> int:
+    if O_NOATIME:
+        try:
+            return os.open(filepath, flags | O_NOATIME, 0o666)
+        except PermissionError:
+            pass
+
+    return os.open(filepath, flags, 0o666)
@@ -0,0 +1,302 @@
+import cracken
+import cracken.journal
+import loader
+import os
+import queue
+import threading
+import time
+
+from cracken.fingerprints import FingerprintDatabase
+from cracken.sinks import Sink
+from cracken.store import ContentStore
+
+QUEUE_SIZE = 64
+
+MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Marks the end of a stream of items in a queue
+DONE = object()
+
+class MemoryBudget:
+    """
+    Limits the number of bytes, that are held by the stages at the same time.
+
+    A single item, that is larger than the whole budget, is still let through
+    once nothing else is held, so it can't block the pipeline forever. Once
+    the event is set, waiting stops with PipelineStopped.
+    """
+
+    def __init__(self, limit: int, event: threading.Event):
+        self.limit = limit
+        self.used  = 0
+        self.event = event
+
+        self.__condition = threading.Condition()
+
+    def acquire(self, size: int):
+        with self.__condition:
+            while self.used and self.used + size > self.limit:
+                if self.event.is_set():
+                    raise PipelineStopped()
+
+                self.__condition.wait(0.1)
+
+            self.used += size
+
+    def release(self, size: int):
+        with self.__condition:
+            self.used -= size
+            self.__condition.notify_all()
+
+class PipelineStopped(Exception):
+
+    pass
+
+class Pipeline:
+    """
+    Runs discover (with classification) -> extract -> load -> render -> write
+    stages concurrently.
+
+    Every stage is a thread, stages are connected with bounded queues, so
+    the first scripts are decompiled while later archives are still being
+    extracted. The listener is called with an event name ('archive', 'file',
+    'known', 'processed' or 'error'), a path and an exception (for 'error').
+    If the listener raises an exception, the pipeline stops and run() raises it.
+    """
+
+    def __init__(self, recursive: bool = False, prettify: bool = False, store: ContentStore | None = None,
+                 fingerprints: FingerprintDatabase | None = None, copy_known: bool = False,
+                 queue_size: int = QUEUE_SIZE, memory_budget: int = MEMORY_BUDGET,
+                 listener=None, event: threading.Event | None = None, sink: Sink | None = None, extract_workers: int = 1):
+        self.recursive    = recursive
+        self.prettify     = prettify
+        self.store        = store
+        self.sink         = sink
+        self.fingerprints = fingerprints
+        self.workers      = extract_workers
+        self.copy_known   = copy_known
+        self.listener     = listener
+        self.event        = event or threading.Event()
+        self.budget       = MemoryBudget(memory_budget, self.event)
+
+        self.archives = queue.Queue(queue_size)
+        self.files    = queue.Queue(queue_size)
+        self.loaded   = queue.Queue(queue_size)
+        self.rendered = queue.Queue(queue_size)
+
+        self.extracted        = []
+        self.extracted_size   = 0
+        self.extract_time     = 0
+        self.nested_extracted = 0
+
+        self.__error = None
+
+    def run(self, paths: list[str]) -> list[str]:
+        """
+        Processes every file found in the given paths. Returns the list of
+        extracted archives.
+        """
+        stages = (
+            (self._discover, paths),
+            (self._extract, ),
+            (self._load, ),
+            (self._render, ),
+            (self._write, ),
+        )
+
+        threads = [threading.Thread(target=self._run_stage, args=stage) for stage in stages]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        if self.__error:
+            raise self.__error
+
+        return self.extracted
+
+    def _run_stage(self, target, *args):
+        try:
+            target(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            if not self.__error:
+                self.__error = e
+
+            self.event.set()
+
+    def _notify(self, name: str, path: str, error: Exception | None = None):
+        if self.listener:
+            self.listener(name, path, error)
+
+    def _put(self, target: queue.Queue, item):
+        while True:
+            if self.event.is_set():
+                raise PipelineStopped()
+
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, source: queue.Queue):
+        while True:
+            if self.event.is_set():
+                raise PipelineStopped()
+
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _classify(self, path: str, archives: list | None = None):
+        if self.event.is_set():
+            raise PipelineStopped()
+
+        if cracken.is_archive(path) or cracken.is_container(path):
+            # Archives, that a resumed run already extracted, have their files on disk
+            if cracken.journal.is_done('archive', path):
+                return
+
+            self._notify('archive', path)
+
+            if archives is None:
+                self._put(self.archives, path)
+            else:
+                archives.append((path, True))
+        elif cracken.is_file(path) and not cracken.journal.is_done('file', path):
+            # Files, that were found in archives, were extracted by this shard, so they belong to it
+            if archives is None and not cracken.shards.owns(path):
+                return
+
+            self._notify('file', path)
+            self._put(self.files, path)
+
+    def _discover(self, paths: list[str]):
+        try:
+            for path in paths:
+                cracken.collect_files(os.path.abspath(path), self._classify)
+        finally:
+            self._put(self.archives, DONE)
+
+    def _extract(self):
+        try:
+            while (path := self._get(self.archives)) is not DONE:
+                # Nested archives and containers are extracted right away instead of going back to the queue
+                self._extract_archives([(path, False)])
+        finally:
+            self._put(self.files, DONE)
+
+    def _extract_container(self, path: str, nested: bool):
+        # A nested container belongs to the shard, that extracted it, see cracken.vfs.process_container
+        archives = []
+
+        for member in cracken.vfs.iter_members(path):
+            if not nested and not member.name.endswith('.rpa') and not cracken.shards.owns(member.path):
+                continue
+
+            with member.open() as file:
+                if member.name.endswith('.rpa'):
+                    index = loader.read_archive_index(file)
+                    index = index if nested else cracken.shards.select(member.path, index)
+
+                    if index:
+                        cracken.process_archive_entries(member.path, loader.iter_entries(file, index), self.recursive,
+                                                        lambda found: self._classify(found, archives), self.store, self.sink,
+                                                        self.prettify, self.budget, self._bundle_failed)
+
+                    continue
+
+                self.budget.acquire(member.size)
+                data = file.read()
+
+            if not loader.is_file_data(member.name, data):
+                self.budget.release(member.size)
+                continue
+
+            if not self.sink:
+                os.makedirs(os.path.dirname(member.path), exist_ok=True)
+
+            # Compiled files from containers skip the load stage, as they are already in memory
+            self._notify('file', member.path)
+            self._put(self.loaded, (member.path, member.size, data))
+
+        self._extract_archives(archives)
+
+    def _extract_archives(self, archives: list[tuple[str, bool]]):
+        while archives:
+            path, nested = archives.pop()
+
+            if cracken.is_container(path):
+                self._extract_container(path, nested)
+                cracken.journal.record('archive', path, cracken.journal.DONE)
+                continue
+
+            # Every entry holds the budget only until it's written, and files are queued as soon as they are written,
+            # so they are decompiled while the rest of the archive is still being extracted
+            start = time.perf_counter()
+            self.extracted_size += cracken.process_archive_file(path, self.recursive, lambda found: self._classify(found, archives),
+                                                                self.store, self.sink, self.prettify, self.workers,
+                                                                nested=nested, budget=self.budget,
+                                                                failed=self._bundle_failed)
+            self.extract_time += time.perf_counter() - start
+
+            self.extracted.append(path)
+            self.nested_extracted += nested
+            cracken.journal.record('archive', path, cracken.journal.DONE)
+
+    def _bundle_failed(self, path: str, error: Exception):
+        # Files in a bundle are decompiled while they are extracted, so they never reach the render stage
+        self._notify('error', path, error)
+
+    def _load(self):
+        try:
+            while (path := self._get(self.files)) is not DONE:
+                size = os.path.getsize(path)
+
+                self.budget.acquire(size)
+
+                with open(path, 'rb') as file:
+                    data = file.read()
+
+                if self.fingerprints and cracken.process_known_file(path, self.fingerprints, self.copy_known, data):
+                    self.budget.release(size)
+                    self._notify('known', path)
+                    continue
+
+                self._put(self.loaded, (path, size, data))
+        finally:
+            self._put(self.loaded, DONE)
+
+    def _render(self):
+        try:
+            while (item := self._get(self.loaded)) is not DONE:
+                path, size, data = item
+
+                try:
+                    text = cracken.decompile_bytes(data, prettify=self.prettify, store=self.store)
+                except Exception as e:
+                    self.budget.release(size)
+                    cracken.journal.record('file', path, cracken.journal.FAILED)
+                    self._notify('error', path, e)
+                    continue
+
+                self._put(self.rendered, (path, size, text))
+        finally:
+            self._put(self.rendered, DONE)
+
+    def _write(self):
+        while (item := self._get(self.rendered)) is not DONE:
+            path, size, text = item
+
+            try:
+                cracken.write_restored_file(path, text, self.store, self.sink)
+            finally:
+                self.budget.release(size)
+
+            cracken.journal.record('file', path, cracken.journal.DONE)
+            self._notify('processed', path)
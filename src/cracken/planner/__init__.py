@@ -0,0 +1,93 @@
+import collections
+import cracken
+import loader
+import os
+
+from cracken.scheduler import CostModel
+
+def make_plan(paths: list[str], model: CostModel | None = None) -> dict:
+    """
+    Estimates the amount of work for the given paths without reading any
+    file contents: only headers and archive indexes are read, including the
+    ones of archives inside of containers.
+
+    Duplicates are files and entries, that share a name and a size with an
+    earlier one. Estimated seconds are only given for a calibrated model.
+    """
+    plan = {
+        'archives': 0,
+        'entries': 0,
+        'extract_bytes': 0,
+        'scripts': 0,
+        'script_bytes': 0,
+        'duplicates': 0,
+        'duplicate_bytes': 0,
+    }
+
+    seen = collections.Counter()
+    script_sizes = []
+
+    def add(name: str, size: int):
+        key = (os.path.basename(name), size)
+
+        if seen[key]:
+            plan['duplicates'] += 1
+            plan['duplicate_bytes'] += size
+
+        seen[key] += 1
+
+        if name.endswith(loader.FILE_EXTENSIONS):
+            plan['scripts'] += 1
+            plan['script_bytes'] += size
+            script_sizes.append(size)
+
+    def add_archive(file):
+        index = loader.read_archive_index(file)
+
+        if not index:
+            return
+
+        plan['archives'] += 1
+
+        for name in index:
+            # A length already includes the prefix of an entry
+            length = index[name][0][1]
+
+            plan['entries'] += 1
+            plan['extract_bytes'] += length
+            add(name, length)
+
+    def add_file(path: str):
+        if path.endswith('.rpa'):
+            with open(path, 'rb') as file:
+                add_archive(file)
+        elif cracken.is_file(path):
+            add(path, os.path.getsize(path))
+        elif cracken.is_container(path):
+            for member in cracken.vfs.iter_members(path):
+                if member.name.endswith('.rpa'):
+                    with member.open() as file:
+                        add_archive(file)
+                else:
+                    add(member.name, member.size)
+
+    for path in paths:
+        cracken.collect_files(os.path.abspath(path), add_file)
+
+    plan['estimated_seconds'] = estimate(plan, script_sizes, model)
+
+    return plan
+
+def estimate(plan: dict, script_sizes: list[int], model: CostModel | None) -> dict | None:
+    if not model:
+        return None
+
+    # Until the model is calibrated, it can only order files, but not tell how long they take
+    res = {'decompile': sum(model.estimate(size) for size in script_sizes) if model.calibrated else None}
+
+    if model.extract_per_byte is not None:
+        res['extract'] = model.extract_per_byte * plan['extract_bytes']
+
+    res['total'] = None if None in res.values() else sum(res.values())
+
+    return res
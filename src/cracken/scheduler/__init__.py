@@ -0,0 +1,265 @@
+import concurrent.futures
+import cracken
+import cracken.journal
+import heapq
+import itertools
+import json
+import loader
+import os
+import threading
+import time
+
+# Files, that extraction keeps open at once: archives and entries being written
+OPEN_FILES = 64
+
+class CostModel:
+    """
+    Estimates how long a file takes to process: overhead + per_byte * size.
+
+    A model is calibrated, once it's fitted on timings of previous runs,
+    until then it orders files by their size only. extract_per_byte holds
+    seconds, that extraction took per byte of archive entries, once it was
+    measured. Only measured fields are saved.
+    """
+
+    def __init__(self, overhead: float | None = None, per_byte: float | None = None,
+                 extract_per_byte: float | None = None):
+        self.overhead         = overhead
+        self.per_byte         = per_byte
+        self.extract_per_byte = extract_per_byte
+
+    @classmethod
+    def load(cls, filepath: str) -> 'CostModel':
+        if not os.path.exists(filepath):
+            return cls()
+
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return cls(**json.load(file))
+
+    @property
+    def calibrated(self) -> bool:
+        return self.overhead is not None and self.per_byte is not None
+
+    def save(self, filepath: str):
+        fields = {'overhead': self.overhead, 'per_byte': self.per_byte, 'extract_per_byte': self.extract_per_byte}
+
+        with open(filepath, 'w', encoding='utf-8') as file:
+            json.dump({name: value for name, value in fields.items() if value is not None}, file)
+
+    def estimate(self, size: int) -> float:
+        if not self.calibrated:
+            return float(size)
+
+        return self.overhead + self.per_byte * size
+
+    def calibrate(self, samples: list[tuple[int, float]]):
+        # Least squares fit of seconds against bytes
+        if len(samples) < 2:
+            return
+
+        count = len(samples)
+        mean_size = sum(size for size, _ in samples) / count
+        mean_time = sum(seconds for _, seconds in samples) / count
+        variance = sum((size - mean_size) ** 2 for size, _ in samples)
+
+        if not variance:
+            return
+
+        per_byte = sum((size - mean_size) * (seconds - mean_time) for size, seconds in samples) / variance
+
+        self.per_byte = max(per_byte, 0.0)
+        self.overhead = max(mean_time - self.per_byte * mean_size, 0.0)
+
+class Report:
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.elapsed = 0.0
+        self.samples = []
+
+    @property
+    def ideal(self) -> float:
+        """
+        The shortest possible makespan for the measured timings:
+        a perfectly balanced load, or the longest single file.
+        """
+        if not self.samples:
+            return 0.0
+
+        durations = [seconds for _, seconds in self.samples]
+
+        return max(sum(durations) / self.workers, max(durations))
+
+    def __str__(self):
+        return '%d file(s) were processed in %.2fs (ideal %.2fs with %d worker(s))' % (
+            len(self.samples), self.elapsed, self.ideal, self.workers)
+
+class IOBudget:
+    """
+    Shares a read rate (bytes per second, 0 for no limit) and a number of
+    open files between every archive, that is being extracted.
+    """
+
+    def __init__(self, rate: int = 0, open_files: int = OPEN_FILES):
+        self.rate       = rate
+        self.open_files = open_files
+
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def consume(self, size: int):
+        """
+        Waits until reading the given number of bytes fits into the rate.
+        """
+        if not self.rate:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + size / self.rate
+            delay = self._next - now
+
+        time.sleep(delay)
+
+    def archives(self, files_per_archive: int) -> int:
+        """
+        Returns how many archives can be extracted at once.
+        """
+        return max(1, self.open_files // files_per_archive)
+
+def plan(paths: list[str], model: CostModel | None = None) -> list[str]:
+    """
+    Orders paths for a longest-processing-time-first dispatch. Files with
+    the same estimate, like every file once per_byte is fitted to 0, are
+    still ordered by their size.
+    """
+    model = model or CostModel()
+    sizes = {path: os.path.getsize(path) for path in paths}
+
+    return sorted(paths, key=lambda path: (model.estimate(sizes[path]), sizes[path]), reverse=True)
+
+def run(executor: concurrent.futures.Executor, workers: int, fn, paths: list[str], *args,
+        model: CostModel | None = None, callback=None) -> Report:
+    """
+    Calls fn(path, *args) for every path on an executor, largest jobs first.
+
+    The callback receives a path and an exception (or None) as soon as the
+    path is processed.
+    """
+    report = Report(workers)
+    start = time.perf_counter()
+
+    futures = {}
+
+    for path in plan(paths, model):
+        futures[executor.submit(_timed, fn, path, *args)] = path
+
+    for future in concurrent.futures.as_completed(futures):
+        path = futures[future]
+
+        try:
+            report.samples.append((os.path.getsize(path), future.result()))
+        except Exception as e:
+            if callback:
+                callback(path, e)
+                continue
+
+            raise
+        else:
+            if callback:
+                callback(path, None)
+
+    report.elapsed = time.perf_counter() - start
+
+    return report
+
+def archive_priority(path: str) -> tuple[int, int]:
+    """
+    Archives with scripts go first, so decompilation could start earliest.
+    Smaller archives go first among the same kind.
+    """
+    with open(path, 'rb') as file:
+        index = loader.read_archive_index(file)
+
+    scripts = index and any(name.endswith(loader.FILE_EXTENSIONS) for name in index)
+
+    return 0 if scripts else 1, os.path.getsize(path)
+
+def extract(paths: list[str], workers: int, recursive: bool, callback, store=None, sink=None, prettify: bool = False,
+            extract_workers: int = 1, budget: IOBudget | None = None, nested: list[str] = (),
+            failed=None) -> tuple[list[str], int]:
+    """
+    Extracts several archives at a time under a shared I/O budget. Archives
+    with scripts are extracted first. With recursive, nested archives are
+    queued as soon as they are found, every other file goes to the callback.
+    Nested archives, including the given ones, are extracted in full even by
+    a shard, see process_archive_file. So is the failed function.
+
+    Returns extracted archives and the total size of their entries.
+    """
+    budget = budget or IOBudget()
+    workers = min(workers, budget.archives(1 + max(extract_workers, cracken.WRITE_WORKERS)))
+
+    queue = []
+    order = itertools.count()
+    extracted = []
+    size = 0
+
+    def push(path, is_nested):
+        # Archives, that a resumed run already extracted, have their files on disk
+        if cracken.journal.is_done('archive', path):
+            return
+
+        cracken.journal.record('archive', path, cracken.journal.PLANNED)
+        heapq.heappush(queue, (archive_priority(path), next(order), path, is_nested))
+
+    def extract_archive(path, is_nested):
+        found = []
+
+        cracken.journal.record('archive', path, cracken.journal.STARTED)
+
+        try:
+            archive_size = cracken.process_archive_file(path, recursive, found.append, store, sink, prettify, extract_workers,
+                                                        lambda _, length: budget.consume(length), is_nested,
+                                                        failed=failed)
+        except Exception:
+            cracken.journal.record('archive', path, cracken.journal.FAILED)
+            raise
+
+        cracken.journal.record('archive', path, cracken.journal.DONE)
+
+        return path, archive_size, found
+
+    for path in paths:
+        push(path, False)
+
+    for path in nested:
+        push(path, True)
+
+    pending = set()
+
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        while queue or pending:
+            while queue and len(pending) < workers:
+                pending.add(executor.submit(extract_archive, *heapq.heappop(queue)[2:]))
+
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                path, archive_size, found = future.result()
+
+                extracted.append(path)
+                size += archive_size
+
+                for found_path in found:
+                    if loader.is_archive(found_path):
+                        push(found_path, True)
+                    elif callback:
+                        callback(found_path)
+
+    return extracted, size
+
+def _timed(fn, path, *args) -> float:
+    start = time.perf_counter()
+    fn(path, *args)
+    return time.perf_counter() - start
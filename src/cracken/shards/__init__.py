@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+
+from cracken import manifest
+
+# A shard of the current run, if there is one
+ACTIVE = None
+
+# Counters of reports, that are the same for every shard or overlap between them, so they aren't summed
+MAX_COUNTERS = (
+    # Shards run at the same time, so the slowest one is the elapsed time of the whole run
+    'elapsed',
+    # Every shard opens every archive in the input to take its share of entries.
+    # Nested archives are extracted by a single shard, so they are summed
+    'archives',
+)
+
+class Shard:
+    """
+    One of several processes, that split a corpus between them. Every path
+    belongs to exactly one shard by a hash of its path relative to the root,
+    so shards don't need to coordinate. Numbers go from 1 to count.
+    """
+
+    def __init__(self, number: int, count: int, root: str):
+        if count < 1 or not 1 <= number <= count:
+            raise ValueError('shard must be a number from 1 to N, got %d/%d' % (number, count))
+
+        self.number = number
+        self.count  = count
+        self.root   = root
+
+    @classmethod
+    def parse(cls, text: str, root: str) -> 'Shard':
+        try:
+            number, count = (int(part) for part in text.split('/'))
+        except ValueError:
+            raise ValueError('shard must look like i/N, got %s' % text) from None
+
+        return cls(number, count, root)
+
+    def __str__(self):
+        return '%d/%d' % (self.number, self.count)
+
+    def owns(self, path: str) -> bool:
+        name = os.path.relpath(path, self.root).replace(os.sep, '/')
+        key = int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'big')
+
+        return key % self.count == self.number - 1
+
+def start(text: str, root: str) -> Shard:
+    global ACTIVE
+
+    ACTIVE = Shard.parse(text, root)
+
+    return ACTIVE
+
+def stop():
+    global ACTIVE
+
+    ACTIVE = None
+
+def owns(path: str) -> bool:
+    return not ACTIVE or ACTIVE.owns(path)
+
+def select(filepath: str, index):
+    """
+    Leaves only entries of an archive index, that belong to the current shard.
+    Entries are placed next to the archive, so their paths are hashed.
+    """
+    if not ACTIVE or not index:
+        return index
+
+    folder = os.path.dirname(filepath)
+
+    return index.subset([position for position, name in enumerate(index.names)
+                         if ACTIVE.owns(os.path.join(folder, *name.split('/')))])
+
+def merge(paths: list[str], output: str):
+    """
+    Combines manifests or reports of several shards into one file. Manifests
+    are merged into one sorted manifest, most counters of reports are summed.
+    """
+    if all(is_report(path) for path in paths):
+        merge_reports(paths, output)
+    else:
+        merge_manifests(paths, output)
+
+def is_report(filepath: str) -> bool:
+    # A manifest is a JSON object per line, while a report is a single object without a hash
+    with open(filepath, 'r', encoding='utf-8') as file:
+        try:
+            data = json.load(file)
+        except json.JSONDecodeError:
+            return False
+
+    return isinstance(data, dict) and 'sha256' not in data
+
+def merge_reports(paths: list[str], output: str):
+    res = {}
+
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as file:
+            report = json.load(file)
+
+        for key, value in report.items():
+            if key in MAX_COUNTERS:
+                res[key] = max(res.get(key, 0), value)
+            elif isinstance(value, (int, float)):
+                res[key] = res.get(key, 0) + value
+
+    res['shards'] = len(paths)
+
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(res, file, indent=2)
+
+def merge_manifests(paths: list[str], output: str):
+    records = {}
+
+    for path in paths:
+        for record in manifest.load(path):
+            known = records.setdefault(record['path'], record)
+
+            if known['sha256'] != record['sha256']:
+                raise ValueError('%s has different hashes in different manifests' % record['path'])
+
+    with open(output, 'w', encoding='utf-8') as file:
+        for name in sorted(records):
+            file.write(json.dumps(records[name]) + '\n')
@@ -0,0 +1,98 @@
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+
+# Results are collected into large blocks before they reach the disk
+BUFFER_SIZE = 4 * 1024 * 1024
+
+# Bundle extensions and tarfile compression methods, that are used for them
+TAR_EXTENSIONS = {
+    '.tar': '',
+    '.tar.gz': 'gz',
+    '.tgz': 'gz',
+    '.tar.bz2': 'bz2',
+    '.tar.xz': 'xz',
+    '.tar.zst': 'zst',
+    '.tzst': 'zst',
+}
+
+class Sink:
+    """
+    Collects every result of a run into a single bundle instead of writing
+    files next to their sources. Paths are stored relative to the root.
+    """
+
+    def __init__(self, filepath: str, root: str):
+        self.filepath = filepath
+        self.root     = root
+
+        self._lock = threading.Lock()
+        self._file = open(filepath, 'wb', buffering=BUFFER_SIZE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def name(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, '/')
+
+    def write(self, path: str, data: bytes):
+        with self._lock:
+            self._write(self.name(path), data)
+
+    def close(self):
+        self._file.close()
+
+    def _write(self, name: str, data: bytes):
+        raise NotImplementedError()
+
+class ZipSink(Sink):
+
+    def __init__(self, filepath: str, root: str):
+        super().__init__(filepath, root)
+
+        self._zip = zipfile.ZipFile(self._file, 'w', zipfile.ZIP_DEFLATED)
+
+    def close(self):
+        self._zip.close()
+        super().close()
+
+    def _write(self, name: str, data: bytes):
+        self._zip.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), data, zipfile.ZIP_DEFLATED)
+
+class TarSink(Sink):
+
+    def __init__(self, filepath: str, root: str, compression: str = ''):
+        super().__init__(filepath, root)
+
+        self._tar = tarfile.open(fileobj=self._file, mode='w|' + compression, bufsize=BUFFER_SIZE)
+
+    def close(self):
+        self._tar.close()
+        super().close()
+
+    def _write(self, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size  = len(data)
+        info.mtime = int(time.time())
+        info.mode  = 0o644
+
+        self._tar.addfile(info, io.BytesIO(data))
+
+def open_sink(filepath: str, root: str) -> Sink:
+    if filepath.endswith('.zip'):
+        return ZipSink(filepath, root)
+
+    for extension, compression in TAR_EXTENSIONS.items():
+        if filepath.endswith(extension):
+            if compression and compression not in tarfile.TarFile.OPEN_METH:
+                raise ValueError('%s bundles are not supported by this version of Python' % extension)
+
+            return TarSink(filepath, root, compression)
+
+    raise ValueError('unknown bundle type: %s' % filepath)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl request, that makes a copy-on-write clone of a whole file
+FICLONE = 0x40049409
+
+# A hardlink shares the read-only attribute of an object on Windows, where a
+# read-only file can't be removed or replaced, so copies are made instead
+HARDLINKS = os.name != 'nt'
+
+def digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class ContentStore:
+    """
+    Content-addressed storage, shared between runs and games.
+
+    Every unique blob is written once into the 'objects' directory and its
+    copies are materialized as reflinks (or hardlinks, see HARDLINKS, or
+    plain copies, if the filesystem can't clone them). Objects are read-only,
+    so an in-place edit of a hardlinked copy fails instead of corrupting the
+    store. Other namespaces hold small records, that map a key (usually a
+    digest of an input) to some data.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, namespace, key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path('objects', key))
+
+    def put(self, data: bytes) -> str:
+        key = digest(data)
+
+        if not self.contains(key):
+            self.write('objects', key, data)
+
+        return key
+
+    def link(self, key: str, path: str):
+        link_file(self._path('objects', key), path)
+
+    def read(self, namespace: str, key: str) -> bytes | None:
+        try:
+            with open(self._path(namespace, key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, namespace: str, key: str, data: bytes):
+        path = self._path(namespace, key)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so a concurrent reader never sees a partial record
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+
+            os.chmod(temp_path, 0o444 if namespace == 'objects' else 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+def link_file(source: str, path: str):
+    if not HARDLINKS:
+        copy_file(source, path)
+        return
+
+    if os.path.lexists(path):
+        os.remove(path)
+
+    # A reflink is an independent file, while a hardlink shares its content with every other copy
+    try:
+        _reflink(source, path)
+    except OSError:
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+
+def copy_file(source: str, path: str):
+    """
+    Makes an independent copy of the file, that is cloned, if the filesystem
+    can do it, so it never shares its content with the source.
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+
+    try:
+        _reflink(source, path)
+    except OSError:
+        shutil.copyfile(source, path)
+
+def _reflink(source: str, path: str):
+    if fcntl is None:
+        raise OSError('reflinks are not supported on this platform')
+
+    with open(source, 'rb') as src, open(path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(path)
+            raise
@@ -0,0 +1,85 @@
+import cracken
+import io
+import loader
+import posixpath
+import tarfile
+import typing
+
+def filter_file(source: typing.BinaryIO, target: typing.BinaryIO, prettify: bool = False):
+    """
+    Reads a compiled file from the source and writes the restored script to
+    the target while it's being rendered.
+    """
+    data = source.read()
+
+    if data[:len(loader.FILE_HEADER)] != loader.FILE_HEADER:
+        raise ValueError('Input is not a compiled Ren\'Py file')
+
+    for part in cracken.iter_decompiled(data, prettify=prettify):
+        target.write(part.encode('utf-8'))
+
+def filter_tar(source: typing.BinaryIO, target: typing.BinaryIO, recursive: bool = False, clear: bool = False,
+               prettify: bool = False, callback=None):
+    """
+    Reads a tar stream and writes it to the target with the same changes, that
+    a regular run makes to a folder: restored scripts are added next to
+    compiled ones and archive entries next to archives.
+
+    The callback receives a member name and an exception, if a file can't be
+    decompiled. Without a callback, the exception is raised.
+    """
+    with tarfile.open(fileobj=source, mode='r|*') as rtar, tarfile.open(fileobj=target, mode='w|') as wtar:
+        for member in rtar:
+            if not member.isfile():
+                wtar.addfile(member)
+                continue
+
+            data = rtar.extractfile(member).read()
+            _filter_member(wtar, member, member.name, data, recursive, clear, prettify, callback)
+
+def _filter_member(wtar: tarfile.TarFile, template: tarfile.TarInfo, name: str, data: bytes,
+                   recursive: bool, clear: bool, prettify: bool, callback):
+    if name.endswith('.rpa'):
+        index = loader.read_archive_index(io.BytesIO(data))
+
+        if index:
+            if not clear:
+                _add(wtar, template, name, data)
+
+            for key, value in loader.iter_entries(io.BytesIO(data), index):
+                entry_name = posixpath.join(posixpath.dirname(name), key)
+
+                if recursive:
+                    _filter_member(wtar, template, entry_name, value, recursive, clear, prettify, callback)
+                else:
+                    _add(wtar, template, entry_name, value)
+
+            return
+
+    _add(wtar, template, name, data)
+
+    if not loader.is_file_data(name, data):
+        return
+
+    try:
+        text = cracken.decompile_bytes(data, prettify=prettify)
+    except Exception as e:
+        if not callback:
+            raise
+
+        callback(name, e)
+        return
+
+    _add(wtar, template, cracken.get_restored_path(name), text.encode('utf-8'))
+
+def _add(wtar: tarfile.TarFile, template: tarfile.TarInfo, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size  = len(data)
+    info.mtime = template.mtime
+    info.mode  = template.mode
+    info.uid   = template.uid
+    info.gid   = template.gid
+    info.uname = template.uname
+    info.gname = template.gname
+
+    wtar.addfile(info, io.BytesIO(data))
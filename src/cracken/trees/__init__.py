@@ -0,0 +1,155 @@
+import importlib
+import marshal
+
+from renpy import EmptyLine, RootNode, TreeList, TreeNode, ValuedNode
+from renpy.ast import Image
+
+# Increase this value every time the layout of a frozen tree changes
+FORMAT_VERSION = 1
+
+# A kind of a table row, that holds a raw code snippet instead of a node
+CODE_KIND = -1
+
+# Attributes, that are still used by the passes after a tree was frozen.
+# Nodes of these classes keep their own __str__, everything else is rendered from the stored text.
+LIVE_ATTRIBUTES = {
+    Image: ('imgname', 'atl', 'value'),
+}
+
+class FrozenNode(TreeNode):
+    """
+    A stand-in for a node of a thawed tree. It keeps the class of the original
+    node, so the passes could still recognize it, but renders stored text.
+    """
+
+    ntext = ''
+
+    def __str__(self):
+        return self.ntext
+
+_frozen_classes = {}
+
+def freeze(tree: RootNode) -> bytes:
+    """
+    Converts a tree to a compact node table: one row per node in pre-order,
+    made of a class reference, a text, a children count and live attributes.
+    """
+    classes = {}
+    kinds, texts, sizes, attributes = [], [], [], {}
+
+    stack = [tree]
+
+    while stack:
+        node = stack.pop()
+
+        if not isinstance(node, TreeNode):
+            if not isinstance(node, str):
+                raise ValueError('unsupported leaf type: %s' % type(node).__name__)
+
+            kinds.append(CODE_KIND)
+            texts.append(str(node))
+            sizes.append(-1)
+            continue
+
+        cls = type(node)
+        name = (cls.__module__, cls.__qualname__)
+
+        if name not in classes:
+            classes[name] = len(classes)
+
+        kinds.append(classes[name])
+
+        if isinstance(node, RootNode):
+            texts.append('')
+        elif isinstance(node, ValuedNode):
+            texts.append(str(node.value))
+        else:
+            texts.append(str(node))
+
+        if cls in LIVE_ATTRIBUTES:
+            attributes[len(kinds) - 1] = tuple(_freeze_attribute(getattr(node, key, None)) for key in LIVE_ATTRIBUTES[cls])
+
+        if node.nchildren is None:
+            sizes.append(-1)
+        else:
+            sizes.append(len(node.nchildren))
+            stack.extend(reversed(node.nchildren))
+
+    return marshal.dumps((FORMAT_VERSION, list(classes), kinds, texts, sizes, attributes))
+
+def thaw(data: bytes) -> RootNode | None:
+    version, names, kinds, texts, sizes, attributes = marshal.loads(data)
+
+    if version != FORMAT_VERSION:
+        return None
+
+    classes = [_resolve_class(module, qualname) for module, qualname in names]
+
+    def build(index):
+        kind = kinds[index]
+
+        if kind == CODE_KIND:
+            return texts[index], index + 1
+
+        cls = classes[kind]
+
+        if cls is RootNode or cls is EmptyLine:
+            node = object.__new__(cls)
+        elif cls is ValuedNode:
+            node = object.__new__(cls)
+            node.value = texts[index]
+        else:
+            node = object.__new__(_frozen_class(cls))
+            node.ntext = texts[index]
+
+        if index in attributes:
+            for key, value in zip(LIVE_ATTRIBUTES[cls], attributes[index]):
+                setattr(node, key, value)
+
+        size = index + 1
+
+        if sizes[index] == -1:
+            node.nchildren = None
+            return node, size
+
+        children = []
+
+        for _ in range(sizes[index]):
+            child, size = build(size)
+            children.append(child)
+
+        node.nchildren = TreeList(children, node)
+
+        return node, size
+
+    return build(0)[0]
+
+def _freeze_attribute(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(str(item) for item in value)
+
+    if value is None or isinstance(value, str):
+        return value
+
+    # Only truthiness of complex objects (like ATL blocks) matters for the passes
+    return bool(value)
+
+def _resolve_class(module: str, qualname: str) -> type:
+    value = importlib.import_module(module)
+
+    for part in qualname.split('.'):
+        value = getattr(value, part)
+
+    return value
+
+def _frozen_class(cls: type) -> type:
+    if cls not in _frozen_classes:
+        namespace = {}
+
+        if cls in LIVE_ATTRIBUTES:
+            namespace['__str__'] = cls.__str__
+
+        # setdefault keeps a single class, even if two threads got here at the same time
+        _frozen_classes.setdefault(cls, type(cls.__name__, (FrozenNode, cls), namespace))
+
+    return _frozen_classes[cls]
@@ -0,0 +1,183 @@
+import cracken
+import io
+import loader
+import os
+import posixpath
+import struct
+import tarfile
+import typing
+import zipfile
+
+from cracken.sinks import Sink
+from cracken.store import ContentStore
+
+# Longer extensions go first, so '.tar.gz' is never taken for '.gz'
+CONTAINER_EXTENSIONS = ('.tar.bz2', '.tar.gz', '.tar.xz', '.tgz', '.tar', '.zip', '.apk')
+
+MEMBER_EXTENSIONS = ('.rpa', ) + loader.FILE_EXTENSIONS
+
+# Size of a fixed part of a local file header in a zip file
+ZIP_HEADER_SIZE = 30
+
+class RangeFile(io.RawIOBase):
+    """
+    A read-only window over a range of bytes of a file.
+    """
+
+    def __init__(self, filepath: str, start: int, size: int):
+        super().__init__()
+
+        self.file     = open(filepath, 'rb')
+        self.start    = start
+        self.size     = size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+
+        self.position = max(0, offset)
+
+        return self.position
+
+    def readinto(self, buffer):
+        length = max(0, min(len(buffer), self.size - self.position))
+
+        self.file.seek(self.start + self.position)
+        read = self.file.readinto(memoryview(buffer)[:length])
+        self.position += read
+
+        return read
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+class Member:
+    """
+    A file inside of a container. Its path points to where the results of
+    processing this member are placed.
+    """
+
+    def __init__(self, name: str, path: str, size: int, opener):
+        self.name = name
+        self.path = path
+        self.size = size
+
+        self.__opener = opener
+
+    def open(self) -> typing.BinaryIO:
+        return self.__opener()
+
+def is_container(filepath: str) -> bool:
+    if filepath.endswith(('.zip', '.apk')):
+        return zipfile.is_zipfile(filepath)
+
+    return filepath.endswith(CONTAINER_EXTENSIONS) and tarfile.is_tarfile(filepath)
+
+def get_output_root(filepath: str) -> str:
+    for extension in CONTAINER_EXTENSIONS:
+        if filepath.endswith(extension):
+            return filepath[:-len(extension)]
+
+    return filepath
+
+def iter_members(filepath: str) -> typing.Iterator[Member]:
+    """
+    Yields archives and compiled files from a zip, an APK or a tar file.
+    """
+    root = get_output_root(filepath)
+
+    if filepath.endswith(('.zip', '.apk')):
+        with zipfile.ZipFile(filepath) as container:
+            for info in container.infolist():
+                name = _apk_name(info.filename) if filepath.endswith('.apk') else info.filename
+
+                if info.is_dir() or not name.endswith(MEMBER_EXTENSIONS):
+                    continue
+
+                yield Member(name, _output_path(root, name), info.file_size, _zip_opener(filepath, container, info))
+    else:
+        with tarfile.open(filepath) as container:
+            for info in container:
+                if not info.isfile() or not info.name.endswith(MEMBER_EXTENSIONS):
+                    continue
+
+                yield Member(info.name, _output_path(root, info.name), info.size,
+                             lambda info=info: container.extractfile(info))
+
+def process_container(filepath: str, recursive: bool, callback, store: ContentStore | None = None,
+                      sink: Sink | None = None, prettify: bool = False, nested: bool = False, failed=None):
+    """
+    Extracts archives and decompiles files from a container without unpacking
+    it. Results are placed into a folder named after the container.
+
+    A nested container was found inside of an archive, so it's processed in
+    full even by a shard. See cracken.process_archive_file for the failed
+    function.
+    """
+    for member in iter_members(filepath):
+        if not nested and not member.name.endswith('.rpa') and not cracken.shards.owns(member.path):
+            continue
+
+        with member.open() as file:
+            if member.name.endswith('.rpa'):
+                index = loader.read_archive_index(file)
+                index = index if nested else cracken.shards.select(member.path, index)
+
+                if index:
+                    cracken.process_archive_entries(member.path, loader.iter_entries(file, index),
+                                                    recursive, callback, store, sink, prettify, failed=failed)
+
+                continue
+
+            data = file.read()
+
+        if not loader.is_file_data(member.name, data):
+            continue
+
+        if not sink:
+            os.makedirs(os.path.dirname(member.path), exist_ok=True)
+
+        cracken.write_restored_file(member.path, cracken.decompile_bytes(data, prettify=prettify, store=store), store, sink)
+
+def _output_path(root: str, name: str) -> str:
+    # Members can't be placed outside of the root
+    parts = [part for part in posixpath.normpath(name).split('/') if part not in ('', '.', '..')]
+
+    return os.path.join(root, *parts)
+
+def _apk_name(name: str) -> str:
+    # Ren'Py for Android keeps game files in 'assets' with an 'x-' prefix in front of every path part
+    if not name.startswith('assets/'):
+        return name
+
+    return '/'.join(part[2:] if part.startswith('x-') else part for part in name.split('/')[1:])
+
+def _zip_opener(filepath: str, container: zipfile.ZipFile, info: zipfile.ZipInfo):
+    def open_member():
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+            return container.open(info)
+
+        # Stored members are read straight from the zip file, so seeking in them costs nothing
+        with open(filepath, 'rb') as file:
+            file.seek(info.header_offset)
+            header = file.read(ZIP_HEADER_SIZE)
+
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+
+        return io.BufferedReader(RangeFile(filepath, info.header_offset + ZIP_HEADER_SIZE + name_length + extra_length,
+                                           info.file_size))
+
+    return open_member
@@ -0,0 +1,248 @@
+import collections
+import cracken
+import json
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+
+from cracken.sinks import Sink
+from cracken.store import ContentStore
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Reasons, why a file is quarantined
+TIMEOUT = 'timeout'
+MEMORY  = 'memory'
+CRASH   = 'crash'
+
+# Messages of a worker, that is ready for work and that started a file
+READY   = 'ready'
+STARTED = 'started'
+
+# How long a worker has to exit on its own before it's killed
+SHUTDOWN_TIMEOUT = 1
+
+class Quarantined:
+    """
+    A file, that took its worker down with it. Such files are not retried.
+    """
+
+    def __init__(self, path: str, reason: str, detail: str | None = None):
+        self.path   = path
+        self.reason = reason
+        self.detail = detail
+
+    def __repr__(self):
+        return '<Quarantined %s %s>' % (self.path, self.reason)
+
+class Worker:
+    """
+    A process, that decompiles files one at a time. Its memory is limited
+    from the inside, while the wall time is watched by the parent.
+
+    A worker reports, when it's ready for work and when it starts a file, so
+    the time it spends on starting up doesn't count against any file.
+    """
+
+    def __init__(self, context, fn, memory: int | None):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, fn, memory), daemon=True)
+        self.process.start()
+
+        child.close()
+
+        self.ready    = False
+        self.path     = None
+        self.deadline = None
+
+    def submit(self, path: str, args: tuple):
+        self.path     = path
+        self.deadline = None
+
+        self.connection.send((path, args))
+
+    def close(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+
+        self.process.join(SHUTDOWN_TIMEOUT)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+
+        self.process.join()
+        self.connection.close()
+
+class Watchdog:
+    """
+    Decompiles files in worker processes under a wall time and a memory limit.
+    A file, that exceeds a limit or crashes its worker, is quarantined and the
+    worker is replaced with a fresh one, so the rest of the files go on.
+
+    Workers are started with the given multiprocessing start method, or the
+    default one of the platform.
+    """
+
+    def __init__(self, workers: int = 1, timeout: float | None = None, memory: int | None = None, fn=None,
+                 start_method: str | None = None):
+        if memory and not is_supported():
+            raise ValueError('memory limits are not supported on this platform')
+
+        self.timeout = timeout
+        self.memory  = memory
+        self.fn      = fn or _decompile_file
+        self.context = multiprocessing.get_context(start_method)
+
+        self._workers = [Worker(self.context, self.fn, memory) for _ in range(max(1, workers))]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def run(self, paths: list[str], prettify: bool, store: ContentStore | None = None, sink: Sink | None = None,
+            callback=None) -> list[Quarantined]:
+        """
+        Writes a restored script for every path, that doesn't get quarantined.
+
+        The callback receives a path and an exception (or None) as soon as the
+        path is processed. Without a callback, the exception is raised.
+        """
+        args = (prettify, store.root if store else None)
+
+        queue = collections.deque(paths)
+        idle = [worker for worker in self._workers if worker.ready]
+        busy = {worker.connection: worker for worker in self._workers if not worker.ready}
+        quarantined = []
+
+        def replace(worker, reason, detail=None):
+            quarantined.append(Quarantined(worker.path, reason, detail))
+
+            worker.kill()
+            self._workers.remove(worker)
+            self._workers.append(Worker(self.context, self.fn, self.memory))
+
+            # A new worker gets files only after it reports, that it's ready
+            busy[self._workers[-1].connection] = self._workers[-1]
+
+        while queue or any(worker.path for worker in busy.values()):
+            while queue and idle:
+                worker = idle.pop()
+                worker.submit(queue.popleft(), args)
+                busy[worker.connection] = worker
+
+            for connection in multiprocessing.connection.wait(list(busy), _wait_time(busy.values())):
+                worker = busy[connection]
+
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    del busy[connection]
+
+                    if not worker.ready:
+                        raise RuntimeError('a worker exited on start with exit code %s' % worker.process.exitcode)
+
+                    replace(worker, CRASH, 'exit code %s' % worker.process.exitcode)
+                    continue
+
+                if message == STARTED:
+                    worker.deadline = time.monotonic() + self.timeout if self.timeout else None
+                    continue
+
+                del busy[connection]
+
+                if message == READY:
+                    worker.ready = True
+                    idle.append(worker)
+                    continue
+
+                text, error = message
+
+                if error == MEMORY:
+                    replace(worker, MEMORY, 'over %d bytes' % self.memory)
+                    continue
+
+                path = worker.path
+                worker.path = None
+                idle.append(worker)
+
+                if error is None:
+                    cracken.write_restored_file(path, text.decode('utf-8'), store, sink)
+                elif callback:
+                    callback(path, error)
+                    continue
+                else:
+                    raise error
+
+                if callback:
+                    callback(path, None)
+
+            now = time.monotonic()
+
+            for connection, worker in list(busy.items()):
+                if worker.deadline and worker.deadline <= now:
+                    del busy[connection]
+                    replace(worker, TIMEOUT, 'over %gs' % self.timeout)
+
+        return quarantined
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+
+def is_supported() -> bool:
+    # Other Unix systems, like macOS, have RLIMIT_AS too, but don't enforce it
+    return sys.platform.startswith('linux') and resource is not None and hasattr(resource, 'RLIMIT_AS')
+
+def write_report(quarantined: list[Quarantined], filepath: str):
+    """
+    Writes quarantined files as JSON lines.
+    """
+    with open(filepath, 'w', encoding='utf-8') as file:
+        for item in quarantined:
+            file.write(json.dumps({'path': item.path, 'reason': item.reason, 'detail': item.detail}) + '\n')
+
+def _wait_time(workers) -> float | None:
+    deadlines = [worker.deadline for worker in workers if worker.deadline]
+
+    if not deadlines:
+        return None
+
+    return max(0, min(deadlines) - time.monotonic())
+
+def _serve(connection, fn, memory: int | None):
+    # Runs inside of a worker process
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, resource.getrlimit(resource.RLIMIT_AS)[1]))
+
+    connection.send(READY)
+
+    while task := connection.recv():
+        path, args = task
+
+        connection.send(STARTED)
+
+        try:
+            connection.send((fn(path, *args), None))
+        except MemoryError:
+            # The heap may be left in any state, so the worker isn't reused
+            connection.send((None, MEMORY))
+            return
+        except Exception as e:
+            try:
+                connection.send((None, e))
+            except Exception:
+                connection.send((None, RuntimeError('%s: %s' % (type(e).__name__, e))))
+
+def _decompile_file(path: str, prettify: bool, store_root: str | None) -> bytes:
+    with open(path, 'rb') as file:
+        return cracken.decompile_in_worker(file.read(), prettify, store_root)
@@ -1,10 +1,212 @@
 import abc
+import array
+import bisect
+import codecs
+import collections.abc
+import gc
+import io
 import pickle
 import struct
+import sys
+import typing
 import zlib
 
 DEFAULT_BLOCK_SIZE = 12
 
+FILE_HEADER = b'RENPY RPC2'
+
+FILE_EXTENSIONS = ('.rpi', '.rpyc', '.rpymc')
+
+# Neighbouring archive entries are read with a single call, until it gets larger than this
+READ_SIZE = 16 * 1024 * 1024
+
+# Entries, that are this close to each other, are still read together, along with the gap between them
+READ_GAP = 64 * 1024
+
+# An archive index is decompressed by chunks of this size while it's being unpickled
+INDEX_CHUNK_SIZE = 1024 * 1024
+
+# Number of leading bytes of an entry, that its type is sniffed from
+SNIFF_SIZE = 16
+
+# Number of distinct leading bytes, that remember their sniffed type
+SNIFF_CACHE_SIZE = 4096
+
+# Leading bytes of known types of entries, an offset of each signature goes first
+SIGNATURES = (
+    (0, FILE_HEADER, 'rpyc'),
+    (0, b'RPA-', 'rpa'),
+    (0, b'\x89PNG', 'png'),
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'GIF8', 'gif'),
+    (8, b'WEBP', 'webp'),
+    (8, b'AVIF', 'avif'),
+    (0, b'OggS', 'ogg'),
+    (0, b'ID3', 'mp3'),
+    (0, b'\xff\xfb', 'mp3'),
+    (0, b'fLaC', 'flac'),
+    (8, b'WAVE', 'wav'),
+    (0, b'\x1a\x45\xdf\xa3', 'webm'),
+    (4, b'ftyp', 'mp4'),
+    (0, b'PK\x03\x04', 'zip'),
+    (0, b'\x00\x01\x00\x00', 'ttf'),
+    (0, b'OTTO', 'otf'),
+    (0, b'wOFF', 'woff'),
+    (0, b'wOF2', 'woff2'),
+    (0, b'\x78\x9c', 'zlib'),
+)
+
+class ArchiveIndex(collections.abc.Mapping):
+    """
+    An archive index, that keeps entries in columns sorted by their names
+    instead of a dict of lists of tuples. Every distinct prefix is stored once
+    and entries refer to it by its position.
+
+    Like a dict, that Ren'Py builds, it maps a name to a list with a single
+    (offset, length, prefix) tuple. The length includes the prefix, which is
+    kept in the index, so only length - len(prefix) bytes are in the file.
+    """
+
+    def __init__(self, names: list[str], offsets: array.array, lengths: array.array, prefixes: list[bytes], refs: array.array):
+        self.names    = names
+        self.offsets  = offsets
+        self.lengths  = lengths
+        self.prefixes = prefixes
+        self.refs     = refs
+
+    @classmethod
+    def from_dict(cls, index: dict, key: int = 0) -> 'ArchiveIndex':
+        """
+        Builds an index from a dict, that is stored in archives. Offsets and
+        lengths are deobfuscated with the key.
+        """
+        names    = sorted(index)
+        entries  = [index[name][0] for name in names]
+        offsets  = array.array('Q', [entry[0] for entry in entries])
+        lengths  = array.array('Q', [entry[1] for entry in entries])
+        prefixes = [b'']
+        refs     = array.array('I', [0]) * len(entries)
+        known    = {b'': 0}
+
+        # Most entries have no prefix, so only the rest are looked at one by one
+        for position, entry in enumerate(entries):
+            if len(entry) < 3 or not entry[2]:
+                continue
+
+            prefix = _prefix_bytes(entry[2])
+            ref = known.setdefault(prefix, len(prefixes))
+
+            if ref == len(prefixes):
+                prefixes.append(prefix)
+
+            refs[position] = ref
+
+        return cls(names, _xor(offsets, key), _xor(lengths, key), prefixes, refs)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return self.position(name) is not None
+
+    def __getitem__(self, name: str) -> list[tuple[int, int, bytes]]:
+        position = self.position(name)
+
+        if position is None:
+            raise KeyError(name)
+
+        return [self.entry(position)]
+
+    def position(self, name: str) -> int | None:
+        position = bisect.bisect_left(self.names, name)
+
+        if position < len(self.names) and self.names[position] == name:
+            return position
+
+        return None
+
+    def entry(self, position: int) -> tuple[int, int, bytes]:
+        return self.offsets[position], self.lengths[position], self.prefixes[self.refs[position]]
+
+    def iter_prefix(self, prefix: str) -> typing.Iterator[str]:
+        """
+        Yields names, that start with the prefix, in sorted order.
+        """
+        for position in range(bisect.bisect_left(self.names, prefix), len(self.names)):
+            if not self.names[position].startswith(prefix):
+                break
+
+            yield self.names[position]
+
+    def subset(self, positions: list[int]) -> 'ArchiveIndex':
+        """
+        Returns an index with entries at the given sorted positions only.
+        """
+        return ArchiveIndex([self.names[position] for position in positions],
+                            array.array('Q', [self.offsets[position] for position in positions]),
+                            array.array('Q', [self.lengths[position] for position in positions]),
+                            self.prefixes,
+                            array.array('I', [self.refs[position] for position in positions]))
+
+    def offset_order(self) -> list[int]:
+        return sorted(range(len(self.names)), key=self.offsets.__getitem__)
+
+class IndexUnpickler(pickle.Unpickler):
+    """
+    Unpickles an archive index, that only holds dicts, lists, tuples, ints,
+    strings and bytes. Archives are untrusted, so any other global is rejected
+    instead of being imported and called.
+    """
+
+    def find_class(self, module, name):
+        # Protocols older than 3 pickle bytes with these globals
+        if (module, name) in (('__builtin__', 'bytes'), ('builtins', 'bytes')):
+            return _empty_bytes
+
+        if (module, name) == ('_codecs', 'encode'):
+            return _latin1_bytes
+
+        raise pickle.UnpicklingError('global %s.%s is not allowed in an archive index' % (module, name))
+
+class ZlibReader(io.RawIOBase):
+    """
+    Decompresses a zlib stream from a file while it's being read.
+    """
+
+    def __init__(self, file: typing.BinaryIO):
+        super().__init__()
+
+        self.file         = file
+        self.decompressor = zlib.decompressobj()
+        self.data         = b''
+        self.position     = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self.position == len(self.data):
+            if self.decompressor.eof:
+                return 0
+
+            # Output is limited to a chunk at a time, so a small index can't expand into a huge buffer
+            source = self.decompressor.unconsumed_tail or self.file.read(INDEX_CHUNK_SIZE)
+
+            if not source:
+                raise zlib.error('Archive index is truncated')
+
+            self.data     = self.decompressor.decompress(source, INDEX_CHUNK_SIZE)
+            self.position = 0
+
+        length = min(len(buffer), len(self.data) - self.position)
+        buffer[:length] = self.data[self.position:self.position + length]
+        self.position += length
+
+        return length
+
 class ArchiveHandler(abc.ABC):
 
     def __init__(self, supported_extensions, supported_headers):
@@ -15,7 +217,7 @@ class ArchiveHandler(abc.ABC):
     def read_index(self, infile):
         pass
 
-# This class was copied from RenPy v8.3.4
+# This class is based on RenPy v8.3.4
 class RPAv1ArchiveHandler(ArchiveHandler):
     """
     Archive handler handling RPAv1 archives.
@@ -25,9 +227,9 @@ class RPAv1ArchiveHandler(ArchiveHandler):
         super().__init__(('.rpi', ), (b'\x78\x9c', ))
 
     def read_index(self, infile):
-        return pickle.loads(zlib.decompress(infile.read()))
+        return ArchiveIndex.from_dict(load_index_data(infile))
 
-# This class was copied from RenPy v8.3.4
+# This class is based on RenPy v8.3.4
 class RPAv2ArchiveHandler(ArchiveHandler):
     """
     Archive handler handling RPAv2 archives.
@@ -40,9 +242,9 @@ class RPAv2ArchiveHandler(ArchiveHandler):
         l = infile.read(24)
         offset = int(l[8:], 16)
         infile.seek(offset)
-        return pickle.loads(zlib.decompress(infile.read()))
+        return ArchiveIndex.from_dict(load_index_data(infile))
 
-# This class was copied from RenPy v8.3.4
+# This class is based on RenPy v8.3.4
 class RPAv3ArchiveHandler(ArchiveHandler):
     """
     Archive handler handling RPAv3 archives.
@@ -52,33 +254,15 @@ class RPAv3ArchiveHandler(ArchiveHandler):
         super().__init__(('.rpa', ), (b'RPA-3.0 ', ))
 
     def read_index(self, infile):
-        def start_to_bytes(s):
-            if not s:
-                return b''
-
-            if not isinstance(s, bytes):
-                s = s.encode("latin-1")
-
-            return s
-
         l = infile.read(40)
 
         offset = int(l[8:24], 16)
         key    = int(l[25:33], 16)
 
         infile.seek(offset)
-        index = pickle.loads(zlib.decompress(infile.read()))
-
-        # deobfuscate an index
-        for k in index.keys():
-            v = index[k]
 
-            if len(v[0]) == 2:
-                index[k] = [(offset ^ key, dlen ^ key) for offset, dlen in v]
-            else:
-                index[k] = [(offset ^ key, dlen ^ key, start_to_bytes(start)) for offset, dlen, start in v]
-
-        return index
+        # offsets and lengths are deobfuscated a whole column at a time
+        return ArchiveIndex.from_dict(load_index_data(infile), key)
 
 ARCHIVE_HANDLERS: tuple[ArchiveHandler] = (
     RPAv1ArchiveHandler(), 
@@ -88,63 +272,202 @@ ARCHIVE_HANDLERS: tuple[ArchiveHandler] = (
 
 MAX_HEADER_LENGTH = max(len(header) for handler in ARCHIVE_HANDLERS for header in handler.supported_headers)
 
+def load_index_data(file: typing.BinaryIO) -> dict:
+    """
+    Unpickles a compressed archive index, that starts at the current position
+    of the file, without keeping all of its decompressed data in memory.
+    """
+    # Every entry is a few new containers, that would make the cycle collector run over and over
+    enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        return IndexUnpickler(io.BufferedReader(ZlibReader(file), INDEX_CHUNK_SIZE)).load()
+    finally:
+        if enabled:
+            gc.enable()
+
 def load_file(filepath: str) -> bytes | None:
     with open(filepath, 'rb') as file:
-        header = file.read(10)
+        return load_bytes(file.read())
 
-        if header != b'RENPY RPC2':
-            return
+def load_bytes(data: bytes) -> bytes | None:
+    if data[:len(FILE_HEADER)] != FILE_HEADER:
+        return
 
-        slot, start, length = None, None, None
+    slot, start, length = None, None, None
+    position = len(FILE_HEADER)
 
-        while not slot or slot > 1:
-            slot, start, length = struct.unpack("III", file.read(DEFAULT_BLOCK_SIZE))
+    while not slot or slot > 1:
+        slot, start, length = struct.unpack_from("III", data, position)
+        position += DEFAULT_BLOCK_SIZE
 
-        if slot == 1:
-            buf = bytearray(length)
+    if slot == 1:
+        return zlib.decompress(data[start:start + length])
 
-            file.seek(start)
-            file.readinto(buf)
+    return None
 
-            return zlib.decompress(buf)
+def load_archive(filepath: str) -> dict | None:
+    with open(filepath, 'rb') as file:
+        index = read_archive_index(file)
 
-        return None
+        if not index:
+            return None
 
-def load_archive(filepath: str) -> tuple[dict | None, bool]:
-    index = None
+        return dict(iter_entries(file, index))
 
-    with open(filepath, 'rb') as file:
-        file_header = file.read(MAX_HEADER_LENGTH)
+def iter_archive(source: bytes | typing.BinaryIO) -> typing.Iterator[tuple[str, bytes]]:
+    """
+    Yields a name and a content of every archive entry. The source is either
+    archive bytes or a seekable binary file object.
+    """
+    file = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    index = read_archive_index(file)
 
-        for handler in ARCHIVE_HANDLERS:
-            for header in handler.supported_headers:
-                if file_header.startswith(header):
-                    file.seek(0)
-                    index = handler.read_index(file)
-                    break
+    if index:
+        yield from iter_entries(file, index)
+
+def read_archive_index(file: typing.BinaryIO) -> ArchiveIndex | None:
+    file_header = file.read(MAX_HEADER_LENGTH)
+
+    for handler in ARCHIVE_HANDLERS:
+        for header in handler.supported_headers:
+            if file_header.startswith(header):
+                file.seek(0)
+                return handler.read_index(file)
+
+    return None
+
+def iter_entries(file: typing.BinaryIO, index: ArchiveIndex | dict, consumed=None) -> typing.Iterator[tuple[str, bytes]]:
+    """
+    Yields entries in order of their offsets, so an archive is read from its
+    start to its end. Neighbouring entries are read with a single call.
+
+    The consumed function receives an offset and a length of every read
+    range, once all of its entries were yielded.
+    """
+    for begin, end, entries in iter_blocks(index):
+        file.seek(begin)
+        block = memoryview(file.read(end - begin))
+
+        for key, value in iter_block_entries(block, begin, entries):
+            yield key, value
+
+        if consumed:
+            consumed(begin, end - begin)
 
-            if index:
+def iter_blocks(index: ArchiveIndex | dict) -> typing.Iterator[tuple[int, int, list]]:
+    """
+    Groups entries into ranges, that are read with a single call. Yields
+    a start and an end of every range along with (offset, size, prefix, name)
+    of its entries, where the size is the number of bytes in the file. Ranges
+    go in order of their offsets.
+    """
+    if not isinstance(index, ArchiveIndex):
+        index = ArchiveIndex.from_dict(index)
+
+    entries = []
+
+    for position in index.offset_order():
+        offset, length, prefix = index.entry(position)
+        entries.append((offset, max(0, length - len(prefix)), prefix, index.names[position]))
+
+    position = 0
+
+    while position < len(entries):
+        first = position
+        begin = entries[first][0]
+        end = begin + entries[first][1]
+        position += 1
+
+        while position < len(entries):
+            offset, length = entries[position][:2]
+
+            if offset - end > READ_GAP or max(end, offset + length) - begin > READ_SIZE:
                 break
 
-        if not index:
-            return None
+            end = max(end, offset + length)
+            position += 1
 
-        res = {}
+        yield begin, end, entries[first:position]
 
-        for key, value in index.items():
-            offset, length, _ = value[0]
+def iter_block_entries(block: memoryview, begin: int, entries: list) -> typing.Iterator[tuple[str, bytes]]:
+    for offset, size, start, key in entries:
+        yield key, start + block[offset - begin:offset - begin + size]
+
+def iter_listing(file: typing.BinaryIO, index: ArchiveIndex | None = None) -> typing.Iterator[dict]:
+    """
+    Yields a name, an offset, a length, a prefix length and a sniffed type of
+    every entry in order of their offsets. Only a few leading bytes of each
+    entry are read.
+    """
+    if index is None:
+        index = read_archive_index(file)
+
+        if index is None:
+            return
 
-            file.seek(offset)
-            res[key] = file.read(length)
+    if not isinstance(index, ArchiveIndex):
+        index = ArchiveIndex.from_dict(index)
 
-        return res
+    order = index.offset_order()
+    window, window_begin = b'', 0
+
+    # Files of the same type usually start with the same bytes
+    types = {}
+
+    for number, position in enumerate(order):
+        offset, length, prefix = index.entry(position)
+        head = prefix[:SNIFF_SIZE]
+        size = min(length - len(prefix), SNIFF_SIZE - len(head))
+
+        if size > 0:
+            if offset < window_begin or offset + size > window_begin + len(window):
+                window, window_begin = _read_heads(file, index, order, number), offset
+
+            head += window[offset - window_begin:offset - window_begin + size]
+
+        kind = types.get(head)
+
+        if kind is None:
+            kind = sniff(head)
+
+            if len(types) < SNIFF_CACHE_SIZE:
+                types[head] = kind
+
+        yield {
+            'name': index.names[position],
+            'offset': offset,
+            'length': length,
+            'prefix': len(prefix),
+            'type': kind,
+        }
+
+def sniff(head: bytes) -> str:
+    if not head:
+        return 'empty'
+
+    for offset, signature, name in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return name
+
+    try:
+        # The head could end in the middle of a character, that is left undecoded
+        text = codecs.getincrementaldecoder('utf-8')().decode(head)
+    except UnicodeDecodeError:
+        return 'binary'
+
+    return 'text' if all(c.isprintable() or c in '\t\r\n' for c in text) else 'binary'
 
 def is_file(filepath: str) -> bool:
-    if not (filepath.endswith('.rpi') or filepath.endswith('.rpyc') or filepath.endswith('.rpymc')):
+    if not filepath.endswith(FILE_EXTENSIONS):
         return False
 
     with open(filepath, 'rb') as file:
-        return file.read(10) == b'RENPY RPC2'
+        return file.read(len(FILE_HEADER)) == FILE_HEADER
+
+def is_file_data(filepath: str, data: bytes) -> bool:
+    return filepath.endswith(FILE_EXTENSIONS) and data[:len(FILE_HEADER)] == FILE_HEADER
 
 def is_archive(filepath: str) -> bool:
     if not filepath.endswith('.rpa'):
@@ -160,7 +483,58 @@ def is_archive(filepath: str) -> bool:
 
                     try:
                         return handler.read_index(file) is not None
-                    except UnicodeDecodeError:
+                    except (UnicodeDecodeError, pickle.UnpicklingError):
                         return False
 
     return False
+
+def _read_heads(file: typing.BinaryIO, index: ArchiveIndex, order: list[int], number: int) -> bytes:
+    # Heads of neighbouring entries are read at once, while large entries are skipped
+    begin = index.offsets[order[number]]
+    end = begin + SNIFF_SIZE
+
+    for following in range(number + 1, len(order)):
+        offset = index.offsets[order[following]]
+
+        if offset + SNIFF_SIZE - begin > READ_GAP:
+            break
+
+        end = offset + SNIFF_SIZE
+
+    file.seek(begin)
+
+    return file.read(end - begin)
+
+def _prefix_bytes(prefix) -> bytes:
+    if not prefix:
+        return b''
+
+    if not isinstance(prefix, bytes):
+        prefix = prefix.encode('latin-1')
+
+    return prefix
+
+def _empty_bytes(*args) -> bytes:
+    if args:
+        raise pickle.UnpicklingError('bytes are not allowed to be built from %r' % (args, ))
+
+    return b''
+
+def _latin1_bytes(text: str, encoding: str) -> bytes:
+    if not isinstance(text, str) or encoding != 'latin1':
+        raise pickle.UnpicklingError('bytes are not allowed to be built from %r' % ((text, encoding), ))
+
+    return text.encode('latin-1')
+
+def _xor(column: array.array, key: int) -> array.array:
+    # The whole column is turned into one integer, so it's XORed by a single operation
+    if not key or not column:
+        return column
+
+    data = column.tobytes()
+    mask = key.to_bytes(column.itemsize, sys.byteorder) * len(column)
+
+    res = array.array(column.typecode)
+    res.frombytes((int.from_bytes(data, sys.byteorder) ^ int.from_bytes(mask, sys.byteorder)).to_bytes(len(data), sys.byteorder))
+
+    return res
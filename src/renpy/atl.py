@@ -148,7 +148,7 @@ class RawMultipurpose(RawStatement):
                 children = RawMultipurpose._list_to_str(value[8:].strip())
 
                 if len(children) == 1:
-                    self.children.append(renpy.ast.ValuedNode('outlines [ %s ]' % children[0]))
+                    self.nchildren.append(renpy.ast.ValuedNode('outlines [ %s ]' % children[0]))
                 else:
                     new_node = renpy.ast.ValuedNode('outlines [')
                     new_node.nchildren = renpy.ast.TreeList(children, new_node)
@@ -0,0 +1,61 @@
+import os
+import pickle
+import pytest
+import subprocess
+import sys
+import zlib
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'cracken.py')
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_while_parser.rpyc')
+
+@pytest.fixture
+def source() -> bytes:
+    """
+    Content of a compiled script, that is placed into archives and containers.
+    """
+    with open(SOURCE, 'rb') as file:
+        return file.read()
+
+@pytest.fixture
+def make_archive(tmp_path):
+    """
+    Builds an RPAv3 archive from a dict of entry names and their contents,
+    or an RPAv2 one without a key. Like Ren'Py, entries with a prefix keep it in the index, while the rest
+    of their content is placed in the file. Entries are placed in the file
+    in the order of the dict, and in the index in the given order, if any.
+    """
+    def make(entries: dict[str, bytes], name: str = 'archive.rpa', key: int | None = 0x42424242,
+             prefixes: dict[str, bytes] | None = None, order: list[str] | None = None) -> str:
+        header_length = 34 if key is not None else 24
+        data = bytearray()
+        index = {}
+
+        for entry_name, content in entries.items():
+            prefix = (prefixes or {}).get(entry_name, b'')
+            index[entry_name] = [((header_length + len(data)) ^ (key or 0), len(content) ^ (key or 0), prefix)]
+            data += content[len(prefix):]
+
+        index = {entry_name: index[entry_name] for entry_name in order or entries}
+        offset = header_length + len(data)
+        path = tmp_path / name
+
+        with open(path, 'wb') as file:
+            file.write(b'RPA-3.0 %016x %08x\n' % (offset, key) if key is not None else b'RPA-2.0 %016x' % offset)
+            file.write(data)
+            file.write(zlib.compress(pickle.dumps(index)))
+
+        return str(path)
+
+    return make
+
+@pytest.fixture
+def run_cli(tmp_path):
+    """
+    Runs cracken.py with the given arguments in a temporary folder, so its
+    logs don't get into the repository.
+    """
+    def run(*args: str, python_options: tuple[str, ...] = ()) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, *python_options, CLI, *args], cwd=tmp_path, capture_output=True, text=True)
+
+    return run
@@ -0,0 +1,33 @@
+import asyncio
+import cracken
+import glob
+import os
+import shutil
+
+PATHS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'test_sl_*.rpyc')))
+
+def test_decompile_many_yields_every_file():
+    async def collect():
+        return [result async for result in cracken.decompile_many(PATHS, limit=3)]
+
+    results = asyncio.run(collect())
+
+    assert sorted(result.path for result in results) == PATHS
+
+    for result in results:
+        with open(result.path, 'rb') as file:
+            assert result.text == cracken.decompile_bytes(file.read())
+
+def test_decompile_many_writes_outputs_and_reports_errors(tmp_path):
+    shutil.copyfile(PATHS[0], tmp_path / 'script.rpyc')
+    (tmp_path / 'broken.rpyc').write_bytes(b'broken')
+
+    async def collect():
+        return {os.path.basename(result.path): result
+                async for result in cracken.decompile_many([str(tmp_path / 'script.rpyc'), str(tmp_path / 'broken.rpyc')], write=True)}
+
+    results = asyncio.run(collect())
+
+    assert results['script.rpyc'].output == str(tmp_path / 'script.rpy')
+    assert (tmp_path / 'script.rpy').read_text(encoding='utf-8') == results['script.rpyc'].text
+    assert results['broken.rpyc'].error is not None
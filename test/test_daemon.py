@@ -0,0 +1,70 @@
+import concurrent.futures
+import cracken
+import glob
+import json
+import os
+import pytest
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+from cracken import daemon
+
+PATHS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.rpyc')))
+
+def request(stream, **kwargs):
+    stream.write(json.dumps(kwargs).encode('utf-8') + b'\n')
+    stream.flush()
+
+    return json.loads(stream.readline())
+
+def test_daemon_serves_files_until_shutdown(tmp_path):
+    if not daemon.is_supported():
+        pytest.skip('Unix domain sockets are not supported on this platform')
+
+    with open(PATHS[0], 'rb') as file:
+        data = file.read()
+
+    (tmp_path / 'game').mkdir()
+    (tmp_path / 'game' / 'script.rpyc').write_bytes(data)
+
+    # Socket paths are limited to about a hundred bytes, which a temporary folder of pytest can exceed
+    socket_folder = tempfile.mkdtemp()
+    socket_path = os.path.join(socket_folder, 'cracken.sock')
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            thread = threading.Thread(target=daemon.Daemon(socket_path, executor).serve, daemon=True)
+            thread.start()
+
+            deadline = time.monotonic() + 10
+
+            while not os.path.exists(socket_path):
+                assert thread.is_alive(), 'the daemon failed to start'
+                assert time.monotonic() < deadline, 'the daemon did not start in time'
+
+                thread.join(0.01)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path)
+                stream = client.makefile('rwb')
+
+                response = request(stream, op='decompile', path=str(tmp_path / 'game' / 'script.rpyc'))
+                assert response == {'ok': True, 'text': cracken.decompile_bytes(data)}
+
+                response = request(stream, op='process', path=str(tmp_path / 'game'))
+                assert response == {'ok': True, 'files': 1, 'errors': []}
+                assert (tmp_path / 'game' / 'script.rpy').read_text(encoding='utf-8') == cracken.decompile_bytes(data)
+
+                assert not request(stream, op='process', path=str(tmp_path / 'missing'))['ok']
+                assert request(stream, op='ping')['cached'] == 1
+                assert request(stream, op='shutdown') == {'ok': True}
+
+            thread.join(10)
+
+            assert not thread.is_alive()
+            assert not os.path.exists(socket_path)
+    finally:
+        shutil.rmtree(socket_folder)
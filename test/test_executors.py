@@ -0,0 +1,57 @@
+import concurrent.futures
+import cracken
+import functools
+import glob
+import loader
+import multiprocessing
+import os
+import pytest
+
+from cracken import executors
+
+PATHS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.rpyc')))
+
+def decompile(path, prettify):
+    with open(path, 'rb') as file:
+        return cracken.decompile_bytes(file.read(), prettify=prettify)
+
+def drops_cache():
+    return cracken.pagecache.ENABLED
+
+def test_thread_executor_renders_as_sequential_run():
+    for prettify in (False, True):
+        expected = [decompile(path, prettify) for path in PATHS]
+
+        with executors.create_executor('thread', 8) as executor:
+            assert list(executor.map(decompile, PATHS, [prettify] * len(PATHS))) == expected
+
+def test_benchmark_measures_each_executor():
+    timings = executors.benchmark(PATHS[:4], workers=2, kinds=('thread', ), fn=loader.load_file)
+
+    assert list(timings) == ['thread']
+    assert timings['thread'] > 0
+
+def test_process_workers_drop_cache_under_spawn(monkeypatch):
+    if not cracken.pagecache.is_supported():
+        pytest.skip('page cache hints are not supported on this platform')
+
+    # Spawned workers start with fresh module state, unlike forked ones
+    spawn = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor',
+                        functools.partial(concurrent.futures.ProcessPoolExecutor, mp_context=spawn))
+    monkeypatch.setattr(cracken.pagecache, 'ENABLED', True)
+
+    with executors.create_executor('process', 1) as executor:
+        assert executor.submit(drops_cache).result()
+
+def test_interpreters_executor_renders_as_sequential_run(tmp_path):
+    if not executors.is_supported('interpreters'):
+        pytest.skip('interpreters executor requires Python 3.14 or higher')
+
+    with open(PATHS[0], 'rb') as file:
+        (tmp_path / 'script.rpyc').write_bytes(file.read())
+
+    with executors.create_executor('interpreters', 2) as executor:
+        executors.file_processor(executor)(str(tmp_path / 'script.rpyc'), False)
+
+    assert (tmp_path / 'script.rpy').read_text(encoding='utf-8') == decompile(PATHS[0], False)
@@ -0,0 +1,39 @@
+import cracken
+import os
+import pytest
+
+ENTRIES = {'game/%d/%d.txt' % (i % 3, i): bytes([i]) * (i + 1) for i in range(50)}
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_process_archive_file_writes_every_entry(make_archive, monkeypatch, workers):
+    # Small blocks make every thread read its own ranges
+    monkeypatch.setattr(cracken.loader, 'READ_SIZE', 64)
+
+    path = make_archive(ENTRIES)
+    found = []
+
+    assert cracken.process_archive_file(path, True, found.append, workers=workers) == sum(map(len, ENTRIES.values()))
+
+    root = os.path.dirname(path)
+
+    assert sorted(found) == sorted(os.path.join(root, *name.split('/')) for name in ENTRIES)
+
+    for name, content in ENTRIES.items():
+        with open(os.path.join(root, *name.split('/')), 'rb') as file:
+            assert file.read() == content
+
+def test_short_reads_are_continued(make_archive, monkeypatch):
+    if not hasattr(os, 'pread'):
+        pytest.skip('pread is not supported on this platform')
+
+    # Stands in for a range, that is larger than a single pread can return
+    pread = os.pread
+    monkeypatch.setattr(os, 'pread', lambda fd, length, offset: pread(fd, min(length, 7), offset))
+
+    path = make_archive(ENTRIES)
+
+    assert cracken.process_archive_file(path, False, None, workers=4) == sum(map(len, ENTRIES.values()))
+
+    for name, content in ENTRIES.items():
+        with open(os.path.join(os.path.dirname(path), *name.split('/')), 'rb') as file:
+            assert file.read() == content
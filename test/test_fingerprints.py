@@ -0,0 +1,57 @@
+import cracken
+import os
+import shutil
+
+from cracken.fingerprints import FingerprintDatabase
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_pass_parser.rpyc')
+
+def test_known_file_is_copied_from_sdk(tmp_path):
+    os.makedirs(tmp_path / 'sdk' / 'renpy' / 'common')
+    os.makedirs(tmp_path / 'game')
+
+    shutil.copyfile(SOURCE, tmp_path / 'sdk' / 'renpy' / 'common' / '00start.rpyc')
+    (tmp_path / 'sdk' / 'renpy' / 'common' / '00start.rpy').write_text('label start:\n    pass\n')
+    shutil.copyfile(SOURCE, tmp_path / 'game' / '00start.rpyc')
+
+    database = FingerprintDatabase()
+
+    assert database.add_sdk(str(tmp_path / 'sdk'), '8.3.4') == 1
+
+    database.save(str(tmp_path / 'fingerprints.json'))
+    database = FingerprintDatabase.load(str(tmp_path / 'fingerprints.json'), str(tmp_path / 'sdk'))
+
+    record = cracken.process_known_file(str(tmp_path / 'game' / '00start.rpyc'), database, True)
+
+    assert record['version'] == '8.3.4'
+    assert record['path'] == 'renpy/common/00start.rpyc'
+    assert record['source'] == 'renpy/common/00start.rpy'
+    assert (tmp_path / 'game' / '00start.rpy').read_text() == 'label start:\n    pass\n'
+    assert not os.path.samefile(tmp_path / 'game' / '00start.rpy', tmp_path / 'sdk' / 'renpy' / 'common' / '00start.rpy')
+
+def test_file_without_source_in_sdk_is_decompiled(tmp_path):
+    for name in ('built', 'local'):
+        os.makedirs(tmp_path / name / 'renpy' / 'common')
+        shutil.copyfile(SOURCE, tmp_path / name / 'renpy' / 'common' / '00start.rpyc')
+
+    (tmp_path / 'built' / 'renpy' / 'common' / '00start.rpy').write_text('label start:\n    pass\n')
+    (tmp_path / 'local' / 'renpy' / 'common' / '00start.rpy').write_text('label start:\n    return\n')
+    shutil.copyfile(SOURCE, tmp_path / 'script.rpyc')
+
+    database = FingerprintDatabase(sdk=str(tmp_path / 'local'))
+    database.add_sdk(str(tmp_path / 'built'), '8.3.4')
+
+    # The source of the local SDK doesn't match, so it's not copied and the file isn't skipped
+    assert cracken.process_known_file(str(tmp_path / 'script.rpyc'), database, True) is None
+    assert not os.path.exists(tmp_path / 'script.rpy')
+
+    os.remove(tmp_path / 'local' / 'renpy' / 'common' / '00start.rpy')
+
+    assert cracken.process_known_file(str(tmp_path / 'script.rpyc'), database, True) is None
+    assert cracken.process_known_file(str(tmp_path / 'script.rpyc'), database, False)['version'] == '8.3.4'
+
+def test_unknown_file_is_not_skipped(tmp_path):
+    shutil.copyfile(SOURCE, tmp_path / 'script.rpyc')
+
+    assert cracken.process_known_file(str(tmp_path / 'script.rpyc'), FingerprintDatabase(), True) is None
+    assert not os.path.exists(tmp_path / 'script.rpy')
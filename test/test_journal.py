@@ -0,0 +1,42 @@
+import cracken
+import os
+import pytest
+
+from cracken import journal
+
+def test_resumed_journal_keeps_finished_items(tmp_path):
+    path = str(tmp_path / 'journal.db')
+
+    first = journal.Journal(path)
+    first.add('file', 'a.rpyc', journal.DONE)
+    first.add('file', 'b.rpyc', journal.STARTED)
+    first.close()
+
+    resumed = journal.Journal(path, resume=True)
+
+    assert resumed.is_done('file', 'a.rpyc')
+    assert not resumed.is_done('file', 'b.rpyc')
+    assert resumed.states() == {journal.DONE: 1, journal.STARTED: 1}
+
+    resumed.close()
+
+    assert not journal.Journal(path).is_done('file', 'a.rpyc')
+
+def test_partial_output_never_replaces_a_file(tmp_path):
+    path = str(tmp_path / 'script.rpy')
+
+    with pytest.raises(RuntimeError):
+        with cracken.pagecache.open_output(path, 'w', encoding='utf-8') as file:
+            file.write('partial')
+            raise RuntimeError()
+
+    assert os.listdir(tmp_path) == []
+
+def test_resume_refuses_to_overwrite_a_bundle(tmp_path, run_cli):
+    (tmp_path / 'out.zip').write_bytes(b'previous run')
+
+    result = run_cli('--journal', str(tmp_path / 'journal.db'), '--resume', '--output', str(tmp_path / 'out.zip'), str(tmp_path))
+
+    assert result.returncode == 2
+    assert '--resume can\'t be used with --output' in result.stderr
+    assert (tmp_path / 'out.zip').read_bytes() == b'previous run'
@@ -0,0 +1,103 @@
+import io
+import json
+import loader
+import os
+import pickle
+import pytest
+import zlib
+
+def test_iter_entries_reads_archive_in_offset_order(make_archive):
+    entries = {'a.txt': b'first', 'b.txt': b'second', 'c.txt': b'third'}
+    path = make_archive(entries, key=None, order=['c.txt', 'a.txt', 'b.txt'])
+
+    with open(path, 'rb') as file:
+        assert list(loader.iter_entries(file, loader.read_archive_index(file))) == list(entries.items())
+
+def test_iter_entries_splits_large_reads(make_archive, monkeypatch):
+    entries = {'%d.txt' % i: bytes([i]) * 10 for i in range(10)}
+    path = make_archive(entries, order=list(entries)[::-1])
+    reads = []
+
+    class File(io.BytesIO):
+
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    monkeypatch.setattr(loader, 'READ_SIZE', 25)
+
+    with open(path, 'rb') as file:
+        file = File(file.read())
+
+    index = loader.read_archive_index(file)
+    reads.clear()
+
+    assert dict(loader.iter_entries(file, index)) == entries
+    assert reads == [20] * 5
+
+def test_archive_index_deobfuscates_columns():
+    key = 0x42424242
+    index = loader.ArchiveIndex.from_dict({
+        'game/b.rpyc': [(100 ^ key, 5 ^ key, b'')],
+        'game/a.rpyc': [(200 ^ key, 7 ^ key, 'ab')],
+        'images/c.png': [(300 ^ key, 9 ^ key)],
+    }, key)
+
+    assert list(index) == ['game/a.rpyc', 'game/b.rpyc', 'images/c.png']
+    assert index['game/a.rpyc'] == [(200, 7, b'ab')]
+    assert index['images/c.png'] == [(300, 9, b'')]
+    assert 'game/c.rpyc' not in index
+    assert list(index.iter_prefix('game/')) == ['game/a.rpyc', 'game/b.rpyc']
+
+def test_load_index_data_accepts_old_protocols():
+    index = {'a.rpyc': [(1, 2, b'')], 'b.rpyc': [(3, 4, b'prefix')]}
+
+    for protocol in (2, pickle.HIGHEST_PROTOCOL):
+        assert loader.load_index_data(io.BytesIO(zlib.compress(pickle.dumps(index, protocol)))) == index
+
+def test_load_index_data_rejects_globals():
+    class Payload:
+
+        def __reduce__(self):
+            return os.system, ('echo unsafe', )
+
+    with pytest.raises(pickle.UnpicklingError):
+        loader.load_index_data(io.BytesIO(zlib.compress(pickle.dumps({'a.rpyc': [Payload()]}))))
+
+def test_iter_listing_sniffs_entry_types(make_archive):
+    entries = {'a.rpyc': loader.FILE_HEADER + b'data', 'b.png': b'\x89PNG\r\n', 'c.txt': 'text ✓'.encode('utf-8'), 'd': b''}
+    path = make_archive(entries)
+
+    with open(path, 'rb') as file:
+        listing = list(loader.iter_listing(file))
+
+    assert [(entry['name'], entry['length'], entry['type']) for entry in listing] == [
+        ('a.rpyc', 14, 'rpyc'), ('b.png', 6, 'png'), ('c.txt', 8, 'text'), ('d', 0, 'empty')]
+
+def test_prefixed_entries_match_renpy(make_archive):
+    # Ren'Py counts a prefix in the length of an entry, so only the rest of it is in the file
+    entries = {'a.txt': b'HEADbody', 'b.txt': b'TRAILER'}
+    path = make_archive(entries, prefixes={'a.txt': b'HEAD'})
+
+    with open(path, 'rb') as file:
+        index = loader.read_archive_index(file)
+
+        assert dict(loader.iter_entries(file, index)) == entries
+
+        file.seek(0)
+        listing = list(loader.iter_listing(file))
+
+    assert [(entry['name'], entry['length'], entry['prefix'], entry['type']) for entry in listing] == [
+        ('a.txt', 8, 4, 'text'), ('b.txt', 7, 0, 'text')]
+
+def test_ls_lists_entries_without_importing_decompiler(make_archive, run_cli):
+    archive = make_archive({'a.txt': b'text', 'b.png': b'\x89PNG\r\n\x1a\n'})
+
+    # The listing has to start fast, so neither renpy nor the rest of cracken is imported
+    result = run_cli('ls', archive, python_options=('-X', 'importtime'))
+    imported = {line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+    assert result.returncode == 0, result.stderr
+    assert [json.loads(line)['name'] for line in result.stdout.splitlines()] == ['a.txt', 'b.png']
+    assert 'loader' in imported
+    assert not imported & {'cracken', 'renpy'}
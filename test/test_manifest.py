@@ -0,0 +1,29 @@
+import cracken
+import hashlib
+import os
+import shutil
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_while_parser.rpyc')
+
+def test_manifest_hashes_entries_and_scripts(tmp_path, make_archive):
+    path = make_archive({'game/image.png': b'png' * 1000})
+    shutil.copy(SOURCE, tmp_path / 'script.rpyc')
+
+    cracken.manifest.start(str(tmp_path / 'manifest.jsonl'), str(tmp_path))
+
+    try:
+        cracken.process_archive_file(path, False, None)
+        cracken.process_file(str(tmp_path / 'script.rpyc'), False)
+    finally:
+        cracken.manifest.stop()
+
+    records = cracken.manifest.load(str(tmp_path / 'manifest.jsonl'))
+
+    assert [(record['path'], record['kind']) for record in records] == [('game/image.png', 'entry'), ('script.rpy', 'script')]
+
+    for record in records:
+        with open(tmp_path / record['path'], 'rb') as file:
+            data = file.read()
+
+        assert record['size'] == len(data)
+        assert record['sha256'] == hashlib.sha256(data).hexdigest()
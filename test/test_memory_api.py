@@ -0,0 +1,23 @@
+import cracken
+import io
+import os
+import shutil
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_if_parser.rpyc')
+
+def test_decompile_bytes_matches_restored_file(tmp_path):
+    shutil.copyfile(SOURCE, tmp_path / 'script.rpyc')
+    cracken.process_file(str(tmp_path / 'script.rpyc'), False)
+
+    with open(SOURCE, 'rb') as file:
+        assert cracken.decompile_bytes(file.read()) == (tmp_path / 'script.rpy').read_text(encoding='utf-8')
+
+def test_iter_archive_reads_bytes_and_file_objects(make_archive):
+    entries = {'script.rpyc': b'RENPY RPC2', 'images/logo.png': b'png'}
+
+    with open(make_archive(entries), 'rb') as file:
+        data = file.read()
+
+    assert dict(cracken.iter_archive(data)) == entries
+    assert dict(cracken.iter_archive(io.BytesIO(data))) == entries
+    assert list(cracken.iter_archive(b'not an archive')) == []
@@ -0,0 +1,27 @@
+import cracken
+import pytest
+
+@pytest.mark.skipif(not cracken.pagecache.is_supported(), reason='page cache hints are not supported')
+def test_archives_are_extracted_with_page_cache_hints(make_archive, monkeypatch):
+    monkeypatch.setattr(cracken.pagecache, 'ENABLED', True)
+
+    path = make_archive({'a.txt': b'first', 'b/c.txt': b'second'})
+    dropped = []
+
+    with cracken.pagecache.open_input(path) as file:
+        index = cracken.loader.read_archive_index(file)
+        consumed = cracken.pagecache.dropper(file)
+
+        def drop(offset, length):
+            dropped.append((offset, length))
+            consumed(offset, length)
+
+        assert dict(cracken.loader.iter_entries(file, index, drop)) == {'a.txt': b'first', 'b/c.txt': b'second'}
+
+    assert dropped == [(34, 11)]
+
+    with cracken.pagecache.open_output(path + '.out', 'w', encoding='utf-8') as file:
+        file.write('text')
+
+    with open(path + '.out', encoding='utf-8') as file:
+        assert file.read() == 'text'
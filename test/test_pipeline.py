@@ -0,0 +1,84 @@
+import cracken
+import io
+import os
+import pytest
+import threading
+import zipfile
+
+from cracken.pipeline import Pipeline
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_menu_parser.rpyc')
+
+def test_pipeline_decompiles_files_from_archives(tmp_path, make_archive):
+    with open(SOURCE, 'rb') as file:
+        data = file.read()
+
+    archive = make_archive({'scripts/first.rpyc': data, 'scripts/second.rpyc': data, 'image.png': b'png'})
+    events = []
+
+    assert Pipeline(recursive=True, listener=lambda name, path, e: events.append((name, path))).run([archive]) == [archive]
+
+    assert (tmp_path / 'image.png').read_bytes() == b'png'
+    assert (tmp_path / 'scripts' / 'first.rpy').read_text(encoding='utf-8') \
+        == (tmp_path / 'scripts' / 'second.rpy').read_text(encoding='utf-8')
+    assert sorted(name for name, _ in events) == ['archive', 'file', 'file', 'processed', 'processed']
+
+def test_pipeline_processes_containers_found_in_archives(tmp_path, make_archive):
+    with open(SOURCE, 'rb') as file:
+        data = file.read()
+
+    bundle = io.BytesIO()
+
+    with zipfile.ZipFile(bundle, 'w') as file:
+        file.writestr('game/options.rpyc', data)
+
+    archive = make_archive({'bundle.zip': bundle.getvalue()})
+
+    Pipeline(recursive=True).run([archive])
+
+    assert (tmp_path / 'bundle' / 'game' / 'options.rpy').read_text(encoding='utf-8') == cracken.decompile_bytes(data)
+
+def test_pipeline_stops_when_listener_raises(tmp_path):
+    (tmp_path / 'broken.rpyc').write_bytes(b'RENPY RPC2' + b'\0' * 12)
+
+    def listener(name, path, e):
+        if name == 'error':
+            raise e
+
+    with pytest.raises(Exception):
+        Pipeline(listener=listener).run([str(tmp_path)])
+
+def test_pipeline_decompiles_while_archive_is_extracted(tmp_path, make_archive, monkeypatch):
+    with open(SOURCE, 'rb') as file:
+        data = file.read()
+
+    # The last entry is written only after the script is decompiled
+    archive = make_archive({'a.rpyc': data, 'z.bin': b'z' * 256 * 1024})
+    processed = threading.Event()
+    waited = []
+    write_archive_entry = cracken.write_archive_entry
+
+    def write_after_script(filepath, *args):
+        if filepath.endswith('z.bin'):
+            waited.append(processed.wait(10))
+
+        write_archive_entry(filepath, *args)
+
+    def listener(name, path, e):
+        if name == 'processed':
+            processed.set()
+
+    monkeypatch.setattr(cracken, 'write_archive_entry', write_after_script)
+
+    Pipeline(recursive=True, memory_budget=1024 * 1024, listener=listener).run([archive])
+
+    assert waited == [True]
+    assert (tmp_path / 'a.rpy').exists()
+
+@pytest.mark.parametrize('option, name', [(['-j', '2'], '--jobs'), (['--timeout', '1'], '--timeout'),
+                                          (['--archive-jobs', '2'], '--archive-jobs'), (['--benchmark'], '--benchmark')])
+def test_pipeline_refuses_options_it_would_ignore(run_cli, option, name):
+    result = run_cli('--pipeline', *option, SOURCE)
+
+    assert result.returncode == 2
+    assert '--pipeline can\'t be used with %s' % name in result.stderr
@@ -0,0 +1,55 @@
+import json
+import os
+import shutil
+import zipfile
+
+from cracken import planner, scheduler
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_while_parser.rpyc')
+
+def test_make_plan_reads_only_indexes(tmp_path, make_archive):
+    make_archive({'game/a.rpyc': b'a' * 10, 'game/b.png': b'b' * 20, 'copy/b.png': b'c' * 20})
+    shutil.copy(SOURCE, tmp_path / 'script.rpyc')
+
+    plan = planner.make_plan([str(tmp_path)], scheduler.CostModel(0.5, 0.01, 0.001))
+
+    assert plan['archives'] == 1
+    assert plan['entries'] == 3
+    assert plan['extract_bytes'] == 50
+    assert plan['scripts'] == 2
+    assert plan['script_bytes'] == 10 + os.path.getsize(SOURCE)
+    assert (plan['duplicates'], plan['duplicate_bytes']) == (1, 20)
+    assert abs(plan['estimated_seconds']['extract'] - 0.05) < 1e-9
+    assert abs(plan['estimated_seconds']['decompile'] - (1.0 + 0.01 * plan['script_bytes'])) < 1e-9
+
+def test_make_plan_counts_prefixes_once(make_archive):
+    path = make_archive({'a.txt': b'HEADbody'}, prefixes={'a.txt': b'HEAD'})
+
+    assert planner.make_plan([path])['extract_bytes'] == 8
+
+def test_make_plan_reads_indexes_of_archives_in_containers(tmp_path, make_archive):
+    archive = make_archive({'a.rpyc': b'a' * 10, 'b.png': b'b' * 20})
+
+    with zipfile.ZipFile(tmp_path / 'game.apk', 'w') as file:
+        file.write(archive, 'assets/x-game/x-archive.rpa', zipfile.ZIP_STORED)
+
+    os.remove(archive)
+
+    plan = planner.make_plan([str(tmp_path / 'game.apk')])
+
+    assert (plan['archives'], plan['entries'], plan['extract_bytes'], plan['scripts']) == (1, 2, 30, 1)
+
+def test_make_plan_gives_no_decompile_estimate_for_uncalibrated_model(tmp_path, make_archive):
+    make_archive({'a.rpyc': b'a' * 10})
+
+    model = scheduler.CostModel(extract_per_byte=0.001)
+    model.save(str(tmp_path / 'model.json'))
+
+    with open(tmp_path / 'model.json', encoding='utf-8') as file:
+        assert json.load(file) == {'extract_per_byte': 0.001}
+
+    estimate = planner.make_plan([str(tmp_path)], scheduler.CostModel.load(str(tmp_path / 'model.json')))['estimated_seconds']
+
+    assert estimate['decompile'] is None
+    assert estimate['total'] is None
+    assert abs(estimate['extract'] - 0.01) < 1e-9
@@ -0,0 +1,58 @@
+import concurrent.futures
+import os
+
+from cracken import scheduler
+
+def test_plan_dispatches_largest_files_first(tmp_path):
+    for name, size in (('small', 10), ('large', 1000), ('medium', 100)):
+        (tmp_path / name).write_bytes(b'\0' * size)
+
+    paths = [str(tmp_path / name) for name in ('small', 'large', 'medium')]
+
+    assert scheduler.plan(paths) == [str(tmp_path / name) for name in ('large', 'medium', 'small')]
+
+def test_plan_orders_equal_estimates_by_size(tmp_path):
+    for name, size in (('small', 10), ('large', 1000), ('medium', 100)):
+        (tmp_path / name).write_bytes(b'\0' * size)
+
+    paths = [str(tmp_path / name) for name in ('small', 'large', 'medium')]
+
+    # Timings, that don't depend on the size, fit per_byte to 0
+    model = scheduler.CostModel()
+    model.calibrate([(100, 2.0), (200, 1.0), (300, 2.0)])
+
+    assert model.per_byte == 0.0
+    assert scheduler.plan(paths, model) == [str(tmp_path / name) for name in ('large', 'medium', 'small')]
+
+def test_cost_model_is_calibrated_from_samples():
+    model = scheduler.CostModel()
+    model.calibrate([(100, 1.5), (200, 2.5), (300, 3.5)])
+
+    assert abs(model.per_byte - 0.01) < 1e-9
+    assert abs(model.overhead - 0.5) < 1e-9
+
+def test_run_reports_makespan(tmp_path):
+    (tmp_path / 'file').write_bytes(b'data')
+
+    processed = []
+
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        report = scheduler.run(executor, 2, processed.append, [str(tmp_path / 'file')])
+
+    assert processed == [str(tmp_path / 'file')]
+    assert len(report.samples) == 1
+    assert report.ideal == report.samples[0][1]
+
+def test_extract_runs_script_archives_first_and_nested_archives(make_archive):
+    with open(make_archive({'inner.txt': b'inner'}, name='inner.rpa'), 'rb') as file:
+        inner = file.read()
+
+    images = make_archive({'images/a.png': b'png'}, name='images.rpa')
+    scripts = make_archive({'script.rpyc': b'x' * 100, 'nested/inner.rpa': inner}, name='scripts.rpa')
+    found = []
+
+    extracted, size = scheduler.extract([images, scripts], 1, True, found.append, budget=scheduler.IOBudget(1024 * 1024))
+
+    assert extracted == [scripts, os.path.join(os.path.dirname(scripts), 'nested', 'inner.rpa'), images]
+    assert size == 100 + len(inner) + 3 + 5
+    assert sorted(os.path.basename(path) for path in found) == ['a.png', 'inner.txt', 'script.rpyc']
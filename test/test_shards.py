@@ -0,0 +1,84 @@
+import cracken
+import cracken.scheduler
+import json
+import os
+import pytest
+
+from cracken import shards
+
+def test_shards_split_archive_entries_without_overlap(make_archive):
+    path = make_archive({'game/%d.txt' % i: b'%d' % i for i in range(30)})
+    root = os.path.dirname(path)
+    names = []
+
+    for number in (1, 2, 3):
+        shards.start('%d/3' % number, root)
+
+        try:
+            with open(path, 'rb') as file:
+                names += shards.select(path, cracken.loader.read_archive_index(file)).names
+        finally:
+            shards.stop()
+
+    assert sorted(names) == sorted('game/%d.txt' % i for i in range(30))
+
+def test_merge_combines_manifests_and_rejects_conflicts(tmp_path):
+    def write(name, records):
+        with open(tmp_path / name, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+
+        return str(tmp_path / name)
+
+    first = write('1.jsonl', [{'path': 'b', 'kind': 'entry', 'size': 1, 'sha256': 'x'}])
+    second = write('2.jsonl', [{'path': 'a', 'kind': 'entry', 'size': 1, 'sha256': 'y'}])
+    conflict = write('3.jsonl', [{'path': 'a', 'kind': 'entry', 'size': 1, 'sha256': 'z'}])
+
+    shards.merge([first, second], str(tmp_path / 'merged.jsonl'))
+
+    assert [record['path'] for record in cracken.manifest.load(str(tmp_path / 'merged.jsonl'))] == ['a', 'b']
+
+    with pytest.raises(ValueError):
+        shards.merge([second, conflict], str(tmp_path / 'merged.jsonl'))
+
+def test_shards_extract_nested_archives_in_full(make_archive, tmp_path):
+    inner = {'inner/%d.txt' % i: b'inner %d' % i for i in range(20)}
+    outer = {'outer/%d.txt' % i: b'outer %d' % i for i in range(10)}
+
+    with open(make_archive(inner, name='inner.rpa'), 'rb') as file:
+        outer['inner.rpa'] = file.read()
+
+    found = set()
+
+    for number in (1, 2):
+        root = tmp_path / ('shard%d' % number)
+        root.mkdir()
+
+        path = make_archive(outer, name='shard%d/game.rpa' % number)
+        shards.start('%d/2' % number, str(root))
+
+        try:
+            cracken.scheduler.extract([path], 1, True, None)
+        finally:
+            shards.stop()
+
+        found |= {os.path.relpath(os.path.join(folder, name), root).replace(os.sep, '/')
+                  for folder, _, names in os.walk(root) for name in names}
+
+    assert found >= set(inner) | set(outer)
+
+def test_merged_report_counts_shared_archives_once(tmp_path):
+    paths = []
+
+    # Both shards open game.rpa, while a.rpa and b.rpa nested in it are extracted by one shard each
+    for number, files in ((1, 3), (2, 4)):
+        paths.append(str(tmp_path / ('%d.json' % number)))
+
+        with open(paths[-1], 'w', encoding='utf-8') as file:
+            json.dump({'archives': 1, 'nested_archives': 1, 'files': files, 'elapsed': number, 'shard': '%d/2' % number},
+                      file)
+
+    shards.merge(paths, str(tmp_path / 'merged.json'))
+
+    with open(tmp_path / 'merged.json', encoding='utf-8') as file:
+        assert json.load(file) == {'archives': 1, 'nested_archives': 2, 'files': 7, 'elapsed': 2, 'shards': 2}
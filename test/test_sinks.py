@@ -0,0 +1,48 @@
+import cracken
+import os
+import struct
+import tarfile
+import zipfile
+import zlib
+
+from cracken.sinks import open_sink
+
+def test_zip_sink_collects_archive_entries(tmp_path, make_archive, source):
+    archive = make_archive({'scripts/story.rpyc': source, 'image.png': b'png'})
+
+    with open_sink(str(tmp_path / 'out.zip'), str(tmp_path)) as sink:
+        cracken.process_archive_file(archive, True, None, sink=sink)
+
+    with zipfile.ZipFile(tmp_path / 'out.zip') as bundle:
+        assert sorted(bundle.namelist()) == ['image.png', 'scripts/story.rpy', 'scripts/story.rpyc']
+        assert bundle.read('scripts/story.rpy').decode('utf-8') == cracken.decompile_bytes(source)
+
+    assert not os.path.exists(tmp_path / 'image.png')
+
+def test_tar_sink_collects_restored_files(tmp_path, source):
+    os.makedirs(tmp_path / 'game')
+    (tmp_path / 'game' / 'script.rpyc').write_bytes(source)
+
+    with open_sink(str(tmp_path / 'out.tar.gz'), str(tmp_path)) as sink:
+        cracken.process_file(str(tmp_path / 'game' / 'script.rpyc'), False, sink=sink)
+
+    with tarfile.open(tmp_path / 'out.tar.gz') as bundle:
+        assert bundle.getnames() == ['game/script.rpy']
+
+    assert not os.path.exists(tmp_path / 'game' / 'script.rpy')
+
+def test_bundle_passes_failed_scripts_to_callback(tmp_path, make_archive, source):
+    # A script, that refers to a module, which can't be imported
+    data = zlib.compress(b'cmissing_module\nNode\n.')
+    broken = b'RENPY RPC2' + struct.pack('III', 1, 34, len(data)) + struct.pack('III', 0, 0, 0) + data
+
+    archive = make_archive({'broken.rpyc': broken, 'good.rpyc': source})
+    failed = []
+
+    with open_sink(str(tmp_path / 'out.zip'), str(tmp_path)) as sink:
+        cracken.process_archive_file(archive, True, None, sink=sink, failed=lambda path, e: failed.append((path, type(e))))
+
+    with zipfile.ZipFile(tmp_path / 'out.zip') as bundle:
+        assert sorted(bundle.namelist()) == ['broken.rpyc', 'good.rpy', 'good.rpyc']
+
+    assert failed == [(str(tmp_path / 'broken.rpyc'), ModuleNotFoundError)]
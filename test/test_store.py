@@ -0,0 +1,69 @@
+import cracken
+import os
+import shutil
+
+from cracken.store import ContentStore
+
+SOURCE = os.path.join(os.path.dirname(__file__), 'test_call_parser_no_arguments.rpyc')
+
+def test_store_writes_unique_blob_once(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+
+    first  = store.put(b'data')
+    second = store.put(b'data')
+
+    store.link(first, str(tmp_path / 'a'))
+    store.link(second, str(tmp_path / 'b'))
+
+    assert first == second
+    assert (tmp_path / 'a').read_bytes() == b'data'
+    assert (tmp_path / 'b').read_bytes() == b'data'
+
+def test_process_file_reuses_rendered_result(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+
+    for name in ('first', 'second', 'plain'):
+        os.makedirs(tmp_path / name)
+        shutil.copyfile(SOURCE, tmp_path / name / 'script.rpyc')
+
+    cracken.process_file(str(tmp_path / 'first' / 'script.rpyc'), False, store)
+    cracken.process_file(str(tmp_path / 'second' / 'script.rpyc'), False, store)
+    cracken.process_file(str(tmp_path / 'plain' / 'script.rpyc'), False)
+
+    expected = (tmp_path / 'plain' / 'script.rpy').read_text(encoding='utf-8')
+
+    assert (tmp_path / 'first' / 'script.rpy').read_text(encoding='utf-8') == expected
+    assert (tmp_path / 'second' / 'script.rpy').read_text(encoding='utf-8') == expected
+    assert len(os.listdir(tmp_path / 'store' / 'rendered')) == 1
+
+def test_store_objects_are_read_only(tmp_path):
+    store = ContentStore(str(tmp_path / 'store'))
+    key = store.put(b'data')
+
+    assert os.stat(store._path('objects', key)).st_mode & 0o777 == 0o444
+
+def test_link_prefers_reflinks(tmp_path, monkeypatch):
+    store = ContentStore(str(tmp_path / 'store'))
+    key = store.put(b'data')
+
+    # Stands in for a filesystem, that can clone files
+    monkeypatch.setattr('cracken.store._reflink', shutil.copyfile)
+    store.link(key, str(tmp_path / 'a'))
+
+    assert not os.path.samefile(store._path('objects', key), tmp_path / 'a')
+    assert (tmp_path / 'a').read_bytes() == b'data'
+
+def test_cache_keys_use_released_version():
+    with open(os.path.join(os.path.dirname(__file__), '..', 'pyproject.toml'), 'r', encoding='utf-8') as file:
+        assert 'version = "%s"' % cracken.VERSION in file.read()
+
+def test_link_copies_objects_without_hardlinks(tmp_path, monkeypatch):
+    store = ContentStore(str(tmp_path / 'store'))
+    key = store.put(b'data')
+
+    monkeypatch.setattr('cracken.store.HARDLINKS', False)
+    store.link(key, str(tmp_path / 'a'))
+    store.link(key, str(tmp_path / 'a'))
+
+    assert not os.path.samefile(store._path('objects', key), tmp_path / 'a')
+    assert os.access(tmp_path / 'a', os.W_OK)
@@ -0,0 +1,34 @@
+import cracken
+import cracken.streams
+import io
+import tarfile
+
+def test_filter_file_writes_restored_script(source):
+    target = io.BytesIO()
+
+    cracken.streams.filter_file(io.BytesIO(source), target)
+
+    assert target.getvalue().decode('utf-8') == cracken.decompile_bytes(source)
+
+def test_filter_tar_restores_scripts_from_archives(make_archive, source):
+    with open(make_archive({'scripts/story.rpyc': source}), 'rb') as file:
+        archive = file.read()
+
+    stream = io.BytesIO()
+
+    with tarfile.open(fileobj=stream, mode='w') as tar:
+        for name, data in (('game/archive.rpa', archive), ('game/options.rpyc', source)):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    stream.seek(0)
+    target = io.BytesIO()
+
+    cracken.streams.filter_tar(stream, target, recursive=True, clear=True)
+
+    target.seek(0)
+
+    with tarfile.open(fileobj=target) as tar:
+        assert tar.getnames() == ['game/scripts/story.rpyc', 'game/scripts/story.rpy', 'game/options.rpyc', 'game/options.rpy']
+        assert tar.extractfile('game/options.rpy').read().decode('utf-8') == cracken.decompile_bytes(source)
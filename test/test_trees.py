@@ -0,0 +1,16 @@
+import cracken
+import glob
+import loader
+import os
+
+from cracken import trees
+
+def test_thawed_trees_are_rendered_as_original():
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.rpyc'))):
+        data = loader.load_file(path)
+
+        for prettify in (False, True):
+            expected = cracken.render_tree(cracken.prepare_tree(cracken.load_tree(data), prettify))
+            thawed   = trees.thaw(trees.freeze(cracken.load_tree(data)))
+
+            assert expected == cracken.render_tree(cracken.prepare_tree(thawed, prettify)), path
@@ -0,0 +1,49 @@
+import cracken
+import io
+import os
+import zipfile
+
+def test_process_container_reads_zip_members(tmp_path, make_archive, source):
+    archive = make_archive({'scripts/story.rpyc': source})
+    container = str(tmp_path / 'game.zip')
+
+    with zipfile.ZipFile(container, 'w') as file:
+        file.write(archive, 'game/archive.rpa', zipfile.ZIP_STORED)
+        file.writestr('game/options.rpyc', source, zipfile.ZIP_DEFLATED)
+
+    assert cracken.is_container(container)
+
+    found = []
+
+    cracken.vfs.process_container(container, True, found.append)
+
+    with open(tmp_path / 'game' / 'game' / 'options.rpy', encoding='utf-8') as file:
+        assert file.read() == cracken.decompile_bytes(source)
+
+    assert found == [os.path.join(str(tmp_path / 'game'), 'game', 'scripts', 'story.rpyc')]
+    assert os.path.isfile(found[0])
+
+def test_iter_members_maps_apk_names(tmp_path, source):
+    container = str(tmp_path / 'game.apk')
+
+    with zipfile.ZipFile(container, 'w') as file:
+        file.writestr('assets/x-game/x-options.rpyc', source)
+        file.writestr('classes.dex', b'')
+
+    members = list(cracken.vfs.iter_members(container))
+
+    assert [member.name for member in members] == ['game/options.rpyc']
+    assert members[0].path == os.path.join(str(tmp_path / 'game'), 'game', 'options.rpyc')
+
+def test_containers_found_in_archives_are_processed(tmp_path, make_archive, run_cli, source):
+    bundle = io.BytesIO()
+
+    with zipfile.ZipFile(bundle, 'w') as file:
+        file.writestr('game/options.rpyc', source)
+
+    make_archive({'bundle.zip': bundle.getvalue()})
+
+    result = run_cli('-r', str(tmp_path))
+
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / 'bundle' / 'game' / 'options.rpy').read_text(encoding='utf-8') == cracken.decompile_bytes(source)
@@ -0,0 +1,65 @@
+import cracken
+import glob
+import multiprocessing
+import os
+import pytest
+import time
+
+from cracken import watchdog
+
+PATHS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '*.rpyc')))
+
+# Workers under spawn import cracken from scratch, which must not count against the timeout
+START_METHODS = [method for method in ('fork', 'spawn') if method in multiprocessing.get_all_start_methods()]
+
+def render(path, prettify, store_root):
+    if path.endswith('slow.rpyc'):
+        time.sleep(60)
+
+    if path.endswith('large.rpyc'):
+        return b' ' * 1024 * 1024 * 1024
+
+    return path.encode('utf-8')
+
+@pytest.mark.parametrize('start_method', START_METHODS)
+def test_slow_file_is_quarantined_and_others_go_on(tmp_path, start_method):
+    paths = [str(tmp_path / name) for name in ('a.rpyc', 'slow.rpyc', 'b.rpyc', 'c.rpyc')]
+    processed = []
+
+    with watchdog.Watchdog(2, timeout=0.5, fn=render, start_method=start_method) as runner:
+        quarantined = runner.run(paths, False, callback=lambda path, e: processed.append(path))
+
+    assert [(item.path, item.reason) for item in quarantined] == [(paths[1], watchdog.TIMEOUT)]
+    assert sorted(processed) == sorted(paths[:1] + paths[2:])
+    assert (tmp_path / 'c.rpy').read_text(encoding='utf-8') == paths[3]
+
+def test_file_over_memory_limit_is_quarantined(tmp_path):
+    if not watchdog.is_supported():
+        pytest.skip('memory limits are not supported on this platform')
+
+    paths = [str(tmp_path / 'large.rpyc'), str(tmp_path / 'a.rpyc')]
+
+    with watchdog.Watchdog(1, memory=512 * 1024 * 1024, fn=render) as runner:
+        quarantined = runner.run(paths, False)
+
+    assert [(item.path, item.reason) for item in quarantined] == [(paths[0], watchdog.MEMORY)]
+    assert (tmp_path / 'a.rpy').exists()
+
+def test_memory_limits_are_refused_where_they_are_not_enforced(monkeypatch):
+    monkeypatch.setattr('sys.platform', 'darwin')
+
+    assert not watchdog.is_supported()
+
+    with pytest.raises(ValueError):
+        watchdog.Watchdog(1, memory=512 * 1024 * 1024)
+
+def test_watched_file_is_restored_as_in_sequential_run(tmp_path):
+    with open(PATHS[0], 'rb') as file:
+        data = file.read()
+
+    (tmp_path / 'script.rpyc').write_bytes(data)
+
+    with watchdog.Watchdog(1, timeout=30) as runner:
+        assert runner.run([str(tmp_path / 'script.rpyc')], False) == []
+
+    assert (tmp_path / 'script.rpy').read_text(encoding='utf-8') == cracken.decompile_bytes(data)